@@ -0,0 +1,138 @@
+import os
+import sys
+import time
+import argparse
+from main import Tables, TableStore, SearchStats, find_shortest_batch, find_shortest_range, write_stats, window_limit, print_window, result_record, print_record
+
+def read_numbers(file):
+    """
+    Liest die gesuchten Zahlen ein, eine pro Zeile. Leere Zeilen werden übersprungen.
+    """
+    numbers = []
+    for line in file:
+        line = line.strip()
+        if line != "":
+            numbers.append(int(line))
+    return numbers
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Decompose many numbers into terms using one digit, sharing the tables between all numbers")
+    parser.add_argument("digits", help="digits to decompose into", type=int, nargs='+', metavar="digit")
+    parser.add_argument("--file", "-f", help="file with one number per line (default: stdin)", default="-")
+    parser.add_argument("--range", "-r", help="decompose every number from LO to HI (inclusive) instead of reading numbers", type=int, nargs=2, metavar=("LO", "HI"))
+    parser.add_argument("--table", help="print one sorted table with both modes at the end instead of streaming a line per result", action='store_true')
+    parser.add_argument("--verbose", "-v", help="enable verbose output", action='store_true')
+    parser.add_argument("--cache", help="directory in which generated tables are stored and reused", metavar="DIR")
+    parser.add_argument("--workers", "-j", help="number of processes used to generate large tables", type=int, default=1)
+    parser.add_argument("--stats", help="write per-level timings, candidate counts, table sizes and peak memory as JSON to FILE ('-' for stdout, after the results)", metavar="FILE")
+    parser.add_argument("--window", help="only keep intermediate values up to K times the largest number (factorials excepted)", type=float, metavar="K")
+    parser.add_argument("--verify-window", help="solve again without the window and report every number whose digit count the window changed", action='store_true')
+    parser.add_argument("--memory", help="keep about MB of terms per table in memory and spill older levels to disk before generating a new level (tables are then not cached)", type=float, metavar="MB")
+    parser.add_argument("--spill", help="directory for spilled levels, created if missing (default: the system's temporary directory)", metavar="DIR")
+    parser.add_argument("--json", help="stream one JSON object per line for every number, digit and mode instead of text", action='store_true')
+    args = parser.parse_args()
+
+    if args.json and args.table:
+        print("Error: --json and --table cannot be combined", file=sys.stderr)
+        exit(1)
+
+    if args.json and args.stats == "-":
+        # Die Standardausgabe enthält dann nur Zeilen mit je einem JSON-Objekt
+        print("Error: --json cannot be combined with --stats -, write the stats to a file", file=sys.stderr)
+        exit(1)
+
+    if args.workers < 1:
+        print("Error: --workers must be at least 1", file=sys.stderr)
+        exit(1)
+
+    if args.spill is not None:
+        try:
+            os.makedirs(args.spill, exist_ok=True)
+        except OSError as e:
+            print("Error: cannot use spill directory:", e, file=sys.stderr)
+            exit(1)
+
+    for digit in args.digits:
+        if len(str(digit)) != 1 or digit == 0:
+            print("Error:", digit, "is not a digit, exiting...", file=sys.stderr)
+            exit(1)
+
+    try:
+        if args.range is not None:
+            numbers = range(args.range[0], args.range[1] + 1)
+        elif args.file == "-":
+            numbers = read_numbers(sys.stdin)
+        else:
+            with open(args.file) as f:
+                numbers = read_numbers(f)
+        value_limit = window_limit(args.window, numbers) if args.window is not None else None
+    except ValueError as e:
+        print("Error:", e, file=sys.stderr)
+        exit(1)
+
+    store = TableStore(args.cache) if args.cache is not None else None
+    memory_limit = int(args.memory * 2 ** 20) if args.memory is not None else None
+
+    # Ziffer -> Modus -> SearchStats
+    stats = {}
+    # (Ziffer, Zahl) -> Modus -> Term, für --table
+    results = {}
+    # (Ziffer, Modus) -> Zahl -> Anzahl der Ziffern, für --verify-window
+    digits_found = {}
+    for digit in args.digits:
+        if args.stats is not None or args.json:
+            stats[digit] = {"normal": SearchStats(), "extended": SearchStats()}
+        # Die erweiterten Tabellen bauen auf den normalen Tabellen derselben Ziffer auf
+        normal = Tables(digit, False, store=store, debug=args.verbose, workers=args.workers, stats=stats.get(digit, {}).get("normal"), value_limit=value_limit,
+                        memory_limit=memory_limit, spill=args.spill)
+        extended = Tables(digit, True, store=store, debug=args.verbose, workers=args.workers, seed=normal, stats=stats.get(digit, {}).get("extended"), value_limit=value_limit,
+                          memory_limit=memory_limit, spill=args.spill)
+        for mode, tables in (("normal", normal), ("extended", extended)):
+            begin = time.perf_counter()
+            if args.range is not None:
+                found = find_shortest_range(args.range[0], args.range[1], digit, mode == "extended", debug=args.verbose, tables=tables)
+            else:
+                found = find_shortest_batch(numbers, tables, debug=args.verbose)
+            for number, res in found:
+                digits_found.setdefault((digit, mode), {})[number] = res.number_of_digits()
+                if args.table:
+                    results.setdefault((digit, number), {})[mode] = res
+                elif args.json:
+                    # Die Zeit läuft seit dem Beginn der Suche mit diesen Tabellen, Ergebnisse erscheinen sobald sie bewiesen sind
+                    print_record(result_record(number, res, True, tables, time.perf_counter() - begin))
+                else:
+                    # Eine Zeile pro Ergebnis: Zahl, Ziffer, Modus, Anzahl der Ziffern, Term
+                    print(number, digit, mode, res.number_of_digits(), res, flush=True)
+
+    if args.table:
+        print("{:>10} {:>5} {:>6} {:>8}  {:40} {}".format("number", "digit", "normal", "extended", "normal term", "extended term"))
+        for (digit, number), res in sorted(results.items()):
+            print("{:>10} {:>5} {:>6} {:>8}  {:40} {}".format(number, digit, res["normal"].number_of_digits(), res["extended"].number_of_digits(),
+                                                              str(res["normal"]), str(res["extended"])))
+
+    # Ohne Fenster erneut suchen: (Zahl, Ziffer, Modus, Ziffern mit Fenster, Ziffern ohne Fenster) für jede Abweichung
+    mismatches = []
+    if value_limit is not None and args.verify_window:
+        for digit in args.digits:
+            normal = Tables(digit, False, store=store, workers=args.workers, memory_limit=memory_limit, spill=args.spill)
+            extended = Tables(digit, True, store=store, workers=args.workers, seed=normal, memory_limit=memory_limit, spill=args.spill)
+            for mode, tables in (("normal", normal), ("extended", extended)):
+                for number, res in find_shortest_batch(numbers, tables):
+                    if digits_found[(digit, mode)][number] != res.number_of_digits():
+                        mismatches.append((number, digit, mode, digits_found[(digit, mode)][number], res.number_of_digits()))
+        for number, digit, mode, windowed, shortest in mismatches:
+            print("window changed result:", number, digit, mode, "found", windowed, "digits, shortest has", shortest, file=sys.stderr)
+        print("window verified:", sum(len(found) for found in digits_found.values()) - len(mismatches), "of",
+              sum(len(found) for found in digits_found.values()), "results are shortest", file=sys.stderr)
+
+    if not args.table and not args.json:
+        print_window(value_limit)
+
+    if args.stats is not None:
+        window = None
+        if value_limit is not None:
+            window = {"value_limit": value_limit, "verified": args.verify_window,
+                      "mismatches": [dict(zip(("number", "digit", "mode", "windowed", "shortest"), m)) for m in mismatches]}
+        write_stats(args.stats, {"numbers": len(numbers), "window": window,
+                                 "digits": {digit: {mode: stats[digit][mode].as_dict() for mode in stats[digit]} for digit in stats}})
@@ -1,18 +1,46 @@
+import os
 import sys
 import math
+import time
+import mmap
+import struct
 import argparse
+import itertools
+import json
+import numpy as np
+from array import array
 from collections import defaultdict
 
 MAX_DIGITS = 100
-FACTORIALS = {}
+# Größte Zahl, deren Fakultät höchstens MAX_DIGITS Ziffern hat (69! hat 99 Ziffern, 70! hat 101)
+MAX_FACTORIAL = 69
 
-_i = 3
-_fac = math.factorial(_i)
-while len(str(_fac)) <= MAX_DIGITS:
-    FACTORIALS[_fac] = _i
-    _i += 1
-    _fac = math.factorial(_i)
-MAX_FACTORIAL = _i -1
+# Fakultät -> Zahl für 3 bis MAX_FACTORIAL, wird erst beim ersten Aufruf von factorial_root() berechnet
+_factorial_roots = None
+
+def factorial_root(value):
+    """
+    Gibt n zurück, falls value die Fakultät n! einer Zahl n von 3 bis MAX_FACTORIAL ist, sonst None.
+    """
+    global _factorial_roots
+    if _factorial_roots is None:
+        _factorial_roots = {math.factorial(n): n for n in range(3, MAX_FACTORIAL + 1)}
+    return _factorial_roots.get(value)
+
+# Potenzen mit mindestens so vielen Bits haben mehr als MAX_DIGITS Ziffern
+POWER_LIMIT = 10 ** MAX_DIGITS
+POWER_LIMIT_BITS = POWER_LIMIT.bit_length()
+
+# Werte mit kleinerem Betrag verarbeitet ScanIndex als int64, Summen und Differenzen von zwei solchen Werten passen noch in int64
+SCAN_INT_LIMIT = 2 ** 62
+
+# Geschätzter Speicherbedarf eines Terms in Bytes: Arena, Werte, Tabellen und ScanIndex zusammen
+TERM_BYTES = 150
+# So viele Einträge einer ausgelagerten Ebene werden auf einmal von der Festplatte gelesen
+SPILL_CHUNK = 1 << 16
+
+# Version des Formats der Cache-Dateien, muss bei jeder Änderung der Termrepräsentation erhöht werden
+CACHE_VERSION = 5
 
 class Term(object):
     """
@@ -126,10 +154,8 @@ class BinaryOperation(Term):
             elif self.op == BinaryOperation.OP_DIV:
                 v1 = self.val1.value()
                 v2 = self.val2.value()
-                res = v1/v2
-                resint = int(res)
-                if res == resint:
-                    self.v = resint
+                if v1 % v2 == 0:
+                    self.v = v1 // v2
             elif self.op == BinaryOperation.OP_POW:
                 self.v = self.val1.value() ** self.val2.value()
         return self.v
@@ -159,201 +185,1590 @@ class BinaryOperation(Term):
         return self.oc
 
 
-def add_to_table(term, table, extended=False):
+class TermArena(object):
+    """
+    Speichert alle Terme einer Tabelle kompakt in parallelen Arrays statt als einzelne Term-Objekte.
+    Ein Term ist ein Index in die Arrays, die Operanden einer Operation sind Indizes von Termen, die vorher eingefügt wurden.
+    """
+
+    # Die binären Operationen benutzen die Werte aus BinaryOperation
+    OP_NUMBER = 5
+    OP_FAC = 6
+
+    OPCHARS = ['+', '-', '*', '/', '^']
+
+    def __init__(self):
+        self.ops = array('b')
+        self.left = array('i')
+        self.right = array('i')
+        self.digits = array('H')
+        self.values = []
+        # Ebene -> (erster Index, letzter Index + 1) der Terme, die generate() für diese Ebene eingefügt hat
+        self.levels = {}
+
+    def __len__(self):
+        return len(self.ops)
+
+    def append(self, op, left, right, value, digits):
+        """
+        Fügt einen Term hinzu und gibt seinen Index zurück.
+        """
+        self.ops.append(op)
+        self.left.append(left)
+        self.right.append(right)
+        self.digits.append(digits)
+        self.values.append(value)
+        return len(self.ops) - 1
+
+    def truncate(self, size):
+        """
+        Entfernt alle Terme ab dem Index size.
+        """
+        del self.ops[size:]
+        del self.left[size:]
+        del self.right[size:]
+        del self.digits[size:]
+        del self.values[size:]
+
+    def value(self, index):
+        """
+        Gibt den Wert des Terms mit dem gegebenen Index zurück. Die Werte ausgelagerter Terme (None) werden neu berechnet.
+        """
+        v = self.values[index]
+        if v is None:
+            v = self.evaluate(index)
+        return v
+
+    def evaluate(self, index):
+        """
+        Berechnet den Wert der Operation mit dem gegebenen Index aus den Werten ihrer Operanden.
+        """
+        op = self.ops[index]
+        v1 = self.value(self.left[index])
+        if op == TermArena.OP_FAC:
+            return math.factorial(v1)
+        v2 = self.value(self.right[index])
+        if op == BinaryOperation.OP_ADD:
+            return v1 + v2
+        elif op == BinaryOperation.OP_SUB:
+            return v1 - v2
+        elif op == BinaryOperation.OP_MULT:
+            return v1 * v2
+        elif op == BinaryOperation.OP_DIV:
+            # Die Tabellen enthalten nur Divisionen ohne Rest
+            return v1 // v2
+        elif op == BinaryOperation.OP_POW:
+            return v1 ** v2
+        raise ValueError('cannot evaluate operation {}'.format(op))
+
+    def render(self, index):
+        """
+        Erzeugt den Text des Terms mit dem gegebenen Index.
+        """
+        op = self.ops[index]
+        if op == TermArena.OP_NUMBER:
+            return str(self.values[index])
+        if op == TermArena.OP_FAC:
+            return '({}!)'.format(self.render(self.left[index]))
+        return '({}{}{})'.format(self.render(self.left[index]), TermArena.OPCHARS[op], self.render(self.right[index]))
+
+    def term(self, index):
+        return ArenaTerm(self, index)
+
+
+class ArenaTerm(Term):
+    """
+    Repräsentiert einen Term, der in einer TermArena gespeichert ist. Der Text wird erst erzeugt, wenn er gebraucht wird.
+    """
+
+    def __init__(self, arena, index):
+        self.arena = arena
+        self.index = index
+
+    def value(self):
+        return self.arena.value(self.index)
+
+    def number_of_digits(self):
+        return self.arena.digits[self.index]
+
+    def __str__(self):
+        return self.arena.render(self.index)
+
+
+def spill_array(path, values):
+    """
+    Schreibt das NumPy-Array values in die Datei path (.npy) und gibt es in den Speicher abgebildet zurück.
+    Die Datei wird ersetzt, nicht überschrieben, bisherige Abbildungen bleiben also gültig.
+    """
+    if values.size == 0:
+        return values
+    np.save(path + '.tmp.npy', values)
+    os.replace(path + '.tmp.npy', path + '.npy')
+    # Als einfaches ndarray, der Zugriff auf einzelne Elemente einer np.memmap ist deutlich langsamer
+    return np.load(path + '.npy', mmap_mode='r').view(np.ndarray)
+
+
+class SpilledLevel(object):
     """
-    Fügt den gegebenen Term der gegebenen Tabelle hinzu.
+    Eine fertige Ebene der split_table, die auf die Festplatte ausgelagert ist: die Indizes ihrer Terme in der Reihenfolge der Ebene
+    und ihre Werte als int64. Werte außerhalb von SCAN_INT_LIMIT bleiben in der Arena und sind in der Datei 0.
+    Wie das Array der Indizes einer Ebene verwendbar, die Einträge werden mit chunks() stückweise gelesen.
+    """
+
+    def __init__(self, path, indices, values):
+        self.indices = spill_array(path + '-indices', np.array(indices, dtype=np.int32))
+        self.values = spill_array(path + '-values', np.array(values, dtype=np.int64))
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __iter__(self):
+        for begin in range(0, len(self), SPILL_CHUNK):
+            yield from self.indices[begin:begin + SPILL_CHUNK].tolist()
+
+    def chunks(self, arena):
+        """
+        Gibt die Einträge als Listen von höchstens SPILL_CHUNK (Wert, Index) zurück.
+        """
+        for begin in range(0, len(self), SPILL_CHUNK):
+            indices = self.indices[begin:begin + SPILL_CHUNK].tolist()
+            values = self.values[begin:begin + SPILL_CHUNK].tolist()
+            yield [(v if arena.values[index] is None else arena.values[index], index) for v, index in zip(values, indices)]
+
+
+def level_items(arena, level):
+    """
+    Gibt die Einträge der fertigen Ebene level (Array der Indizes oder SpilledLevel) als Liste von (Wert, Index) zurück.
+    """
+    if isinstance(level, SpilledLevel):
+        return [item for chunk in level.chunks(arena) for item in chunk]
+    return [(arena.values[index], index) for index in level]
+
+
+class AggregatedTable(dict):
+    """
+    Die aggregierte Tabelle von Tables mit Speicherbudget. Die Einträge ausgelagerter Ebenen stehen nicht mehr im Dictionary,
+    sondern nach Wert sortiert in zwei Arrays (Werte und Indizes), die aus Dateien im Verzeichnis directory in den Speicher abgebildet werden.
+    Ein Bitfeld über die unteren Bits der ausgelagerten Werte beantwortet die meisten Anfragen nach fehlenden Werten ohne Suche.
+    """
+
+    # Bits im Bitfeld pro ausgelagertem Wert
+    BITMAP_BITS = 16
+
+    def __init__(self, directory):
+        super().__init__()
+        self.directory = directory
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        # Anzahl der ausgelagerten Einträge
+        self.spilled = 0
+        self.bitmap = bytearray(1)
+        self.mask = 7
+
+    def find(self, value):
+        """
+        Gibt den Index des ausgelagerten Terms für value zurück oder -1.
+        """
+        if self.spilled == 0 or not -SCAN_INT_LIMIT < value < SCAN_INT_LIMIT:
+            return -1
+        masked = value & self.mask
+        if not self.bitmap[masked >> 3] >> (masked & 7) & 1:
+            return -1
+        pos = int(self.keys.searchsorted(value))
+        if pos < self.spilled and int(self.keys[pos]) == value:
+            return int(self.indices[pos])
+        return -1
+
+    def __contains__(self, value):
+        return dict.__contains__(self, value) or self.find(value) >= 0
+
+    def __getitem__(self, value):
+        index = dict.get(self, value)
+        if index is None:
+            index = self.find(value)
+            if index < 0:
+                raise KeyError(value)
+        return index
+
+    def __len__(self):
+        return dict.__len__(self) + self.spilled
+
+    def __iter__(self):
+        yield from dict.__iter__(self)
+        for begin in range(0, self.spilled, SPILL_CHUNK):
+            yield from self.keys[begin:begin + SPILL_CHUNK].tolist()
+
+    def spill(self, keys, indices):
+        """
+        Lagert die Einträge keys (Werte mit kleinerem Betrag als SCAN_INT_LIMIT) mit ihren Indizes indices aus.
+        """
+        for k in keys:
+            dict.__delitem__(self, k)
+        keys = np.concatenate((self.keys, np.array(keys, dtype=np.int64)))
+        indices = np.concatenate((self.indices, np.array(indices, dtype=np.int32)))
+        order = np.argsort(keys, kind='stable')
+        self.keys = spill_array(os.path.join(self.directory, 'aggregated-keys'), keys[order])
+        self.indices = spill_array(os.path.join(self.directory, 'aggregated-indices'), indices[order])
+        self.spilled = len(keys)
+
+        bits = max(8, 1 << (self.spilled * AggregatedTable.BITMAP_BITS - 1).bit_length())
+        self.mask = bits - 1
+        bitmap = np.zeros(bits // 8, dtype=np.uint8)
+        masked = keys & self.mask
+        np.bitwise_or.at(bitmap, masked >> 3, np.left_shift(1, masked & 7).astype(np.uint8))
+        self.bitmap = bytearray(bitmap.tobytes())
+
+
+def add_to_table(arena, table, op, left, right, value, digits, extended=False, aggregated_table=None):
+    """
+    Fügt den Term, der durch die Operation op auf den Termen left und right entsteht, der gegebenen Tabelle hinzu,
+    falls es noch keinen Term mit dem gleichen Wert und höchstens so vielen Ziffern gibt.
     Wenn extended wahr, wird auch die Fakulätsfunktion gebildet und der Tabelle hinzugefügt.
+    Falls aggregated_table gegeben, werden Werte, die dort mit weniger Ziffern stehen, nicht hinzugefügt:
+    jeder Term mit ihnen wäre mit dem kürzeren Term für den Wert ebenfalls kürzer.
+    Der Term wird nur in die Arena eingefügt, wenn er gebraucht wird. Gibt seinen Index zurück oder -1.
     """
-    val = term.value()
-    if extended and val >= 3 and val <= MAX_FACTORIAL:
-        add_to_table(UnaryOperation(term, UnaryOperation.OP_FAC), table, extended=extended)
-    digits = term.number_of_digits()
-    if val in table and table[val][1] < digits:
-        return
-    table[val] = (term, digits)
+    index = -1
+    if extended and value >= 3 and value <= MAX_FACTORIAL:
+        fac = math.factorial(value)
+        if (fac not in table or arena.digits[table[fac]] > digits) and not dominated(arena, aggregated_table, fac, digits):
+            index = arena.append(op, left, right, value, digits)
+            add_to_table(arena, table, TermArena.OP_FAC, index, -1, fac, digits, extended, aggregated_table)
+    if value in table and arena.digits[table[value]] <= digits or dominated(arena, aggregated_table, value, digits):
+        return index
+    if index == -1:
+        index = arena.append(op, left, right, value, digits)
+    table[value] = index
+    return index
+
+
+def dominated(arena, aggregated_table, value, digits):
+    """
+    Gibt zurück, ob aggregated_table (oder None) einen Term für value mit weniger als digits Ziffern enthält.
+    """
+    return aggregated_table is not None and value in aggregated_table and arena.digits[aggregated_table[value]] < digits
+
+
+def power_fits(base, exponent):
+    """
+    Gibt zurück, ob base^exponent (base, exponent >= 2) höchstens MAX_DIGITS Ziffern hat.
+    Die Potenz liegt zwischen 2^((b-1)*exponent) und 2^(b*exponent) mit b Bits von base, nur dazwischen wird sie berechnet.
+    """
+    bits = base.bit_length()
+    if (bits - 1) * exponent >= POWER_LIMIT_BITS:
+        return False
+    if bits * exponent < POWER_LIMIT_BITS:
+        return True
+    return base ** exponent < POWER_LIMIT
+
+
+def iroot(n, k):
+    """
+    Gibt die ganzzahlige k-te Wurzel von n >= 0 zurück, d.h. die größte Zahl r mit r^k <= n.
+    """
+    if n < 2:
+        return n
+    if k >= n.bit_length():
+        return 1
+    if k == 2:
+        return math.isqrt(n)
+    # Newton-Verfahren, beginnend über der Wurzel
+    r = 1 << -(-n.bit_length() // k)
+    while True:
+        s = ((k - 1) * r + n // r ** (k - 1)) // k
+        if s >= r:
+            return r
+        r = s
+
+
+def perfect_powers(n):
+    """
+    Gibt alle Darstellungen von n als Potenz r^e mit r, e >= 2 als Liste von (r, e) zurück.
+    """
+    res = []
+    if n < 4:
+        return res
+    for e in range(2, n.bit_length()):
+        r = iroot(n, e)
+        if r < 2:
+            break
+        if r ** e == n:
+            res.append((r, e))
+    return res
 
 
-def generate(digit, num_digits, aggregated_table, split_table, extended, debug=False):
+class SearchTimeout(Exception):
+    """
+    Wird ausgelöst, wenn die Deadline erreicht ist, bevor eine Ebene fertig generiert ist.
+    """
+    pass
+
+
+# Nach so vielen Paaren von Operanden prüft combine() die Deadline
+DEADLINE_CHECK_PAIRS = 4096
+
+def combine(op1_items, op2_items, known, extended, start=0, end=None, deadline=None, basic=True, symmetric=False):
+    """
+    Verknüpft die Terme aus op1_items mit den Termen aus op2_items (Listen von (Wert, Index)) durch alle Rechenoperationen.
+    Falls nicht basic, werden nur Potenzen gebildet.
+    Falls symmetric, sind op1_items und op2_items die gleiche Ebene und nur Paare (i, j) mit j >= i werden verknüpft:
+    die Operanden werden nach ihrem Wert geordnet, (j, i) bildet also genau die gleichen Kandidaten wie (i, j).
+    Betrachtet werden nur die Paare start bis end (ausschließlich) in der Reihenfolge, in der die beiden Schleifen sie durchlaufen.
+    Gibt für jeden Wert, der nicht in known ist, die erste Operation, die ihn bildet, als Liste von (Wert, Operation, linker Index, rechter Index) zurück,
+    zusammen mit der Anzahl der berechneten Kandidaten je Operation (Liste, Index ist die Operation).
+    Falls deadline (time.monotonic()) erreicht ist, wird SearchTimeout ausgelöst.
+    """
+    # Alle Terme einer Ebene haben gleich viele Ziffern, ein Kandidat verbessert die Ebene also nur, wenn sein Wert neu ist.
+    # Nur dann wird er gespeichert, alle anderen werden nur als int berechnet.
+    found = {}
+    evaluated = [0] * 5
+    if end is None:
+        end = len(op1_items) * len(op2_items)
+    if start >= end:
+        return [], evaluated
+    powers = divisions = 0
+
+    for block in range(start, end, DEADLINE_CHECK_PAIRS):
+        if deadline is not None and time.monotonic() > deadline:
+            raise SearchTimeout()
+        block_end = min(block + DEADLINE_CHECK_PAIRS, end)
+        for i in range(block // len(op2_items), (block_end - 1) // len(op2_items) + 1):
+            op1_k, op1_v = op1_items[i]
+            row = op2_items[max(block - i * len(op2_items), i if symmetric else 0):block_end - i * len(op2_items)]
+            if basic:
+                evaluated[BinaryOperation.OP_ADD] += len(row)
+                evaluated[BinaryOperation.OP_SUB] += 2 * len(row)
+                evaluated[BinaryOperation.OP_MULT] += len(row)
+            for op2_k, op2_v in row:
+                # Make sure that a_k > b_k
+                if op1_k < op2_k:
+                    a_k, a_v, b_k, b_v = op2_k, op2_v, op1_k, op1_v
+                else:
+                    a_k, a_v, b_k, b_v = op1_k, op1_v, op2_k, op2_v
+
+                if basic:
+                    value = a_k + b_k
+                    if value not in found and value not in known:
+                        found[value] = (BinaryOperation.OP_ADD, a_v, b_v)
+                    value = a_k - b_k
+                    if value not in found and value not in known:
+                        found[value] = (BinaryOperation.OP_SUB, a_v, b_v)
+                    value = b_k - a_k
+                    if value not in found and value not in known:
+                        found[value] = (BinaryOperation.OP_SUB, b_v, a_v)
+                    value = a_k * b_k
+                    if value not in found and value not in known:
+                        found[value] = (BinaryOperation.OP_MULT, a_v, b_v)
+                if extended and a_k >= 2 and b_k >= 2:
+                    if power_fits(a_k, b_k):
+                        powers += 1
+                        value = a_k ** b_k
+                        if value not in found and value not in known:
+                            found[value] = (BinaryOperation.OP_POW, a_v, b_v)
+                    if power_fits(b_k, a_k):
+                        powers += 1
+                        value = b_k ** a_k
+                        if value not in found and value not in known:
+                            found[value] = (BinaryOperation.OP_POW, b_v, a_v)
+
+                if basic and b_k != 0:
+                    divisions += 1
+                    if a_k % b_k == 0:
+                        value = a_k // b_k
+                        if value not in found and value not in known:
+                            found[value] = (BinaryOperation.OP_DIV, a_v, b_v)
+
+    evaluated[BinaryOperation.OP_POW] = powers
+    evaluated[BinaryOperation.OP_DIV] = divisions
+    return [(value, op, left, right) for value, (op, left, right) in found.items()], evaluated
+
+
+# Argumente von combine() in den Prozessen von generate(), werden beim Start der Prozesse geerbt statt übertragen
+_combine_args = None
+
+def _combine_range(bounds):
+    op1_items, op2_items, known, extended, deadline, basic, symmetric = _combine_args
+    return combine(op1_items, op2_items, known, extended, start=bounds[0], end=bounds[1], deadline=deadline, basic=basic, symmetric=symmetric)
+
+
+# Ab so vielen Paaren von Operanden verteilt generate() die Paare auf mehrere Prozesse
+PARALLEL_MIN_PAIRS = 50000
+# So viele Paare von Operanden verknüpft combine_all() höchstens auf einmal
+CHUNK_PAIRS = 1 << 18
+
+def generate(digit, num_digits, arena, aggregated_table, split_table, extended, debug=False, workers=1, deadline=None, seed=None, stats=None, value_limit=None):
     """
     Erweitert die Tabelle und fügt alle Terme mit der gegebenen Anzahl an Ziffern hinzu.
+    Die aggregierte Tabelle und die Ebene num_digits bilden Werte auf Indizes in arena ab, die fertigen Ebenen sind Arrays dieser Indizes.
     Falls extended, werden auch Fakultäts- und Potenzfunktionen gebildet.
     Falls debug, werden zusätzliche Informationen ausgegeben.
+    Falls workers > 1, werden die Paare von Operanden in zusammenhängenden Stücken auf so viele Prozesse verteilt.
+    Die Ergebnisse werden in der Reihenfolge der Stücke übernommen, die Tabelle ist also genau die gleiche wie mit einem Prozess.
+    Falls die Ebene bis deadline (time.monotonic()) nicht fertig ist, werden ihre Terme wieder entfernt und SearchTimeout ausgelöst.
+    Falls seed gegeben, ist es (normal, seeded) mit den bis num_digits generierten Tables des normalen Modus und einer Abbildung ihrer Indizes
+    auf die Indizes der Terme mit gleichem Wert und gleich vielen Ziffern in arena. Siehe expand().
+    Falls stats (Dictionary einer Ebene von SearchStats) gegeben, werden dort die berechneten, übernommenen und verworfenen Kandidaten gezählt.
+    Falls value_limit gegeben, werden nur Werte mit höchstens diesem Betrag aufgenommen, außer Fakultäten: große Werte führen fast nur
+    als Dividend einer Fakultät wieder zu kleinen Zahlen. Die Suche ist dann nur noch innerhalb dieses Fensters optimal.
     """
+    current_split_table = split_table[num_digits]
+    start = len(arena)
+
+    try:
+        expand(num_digits, arena, aggregated_table, split_table, extended, workers, deadline, seed, stats, value_limit)
+    except SearchTimeout:
+        # Vor generate() enthält die Ebene nur die Zahl aus num_digits Ziffern und ihre Fakultäten, die vor start eingefügt wurden
+        arena.truncate(start)
+        split_table[num_digits] = {k: index for k, index in current_split_table.items() if index < start}
+        raise
+
+    arena.levels[num_digits] = (start, len(arena))
+    if debug:
+        print("generated split table with digits:", num_digits, file=sys.stderr)
 
-    current_split_table = split_table[num_digits]        
-    next_split_table = split_table[num_digits+1]
+    return aggregate(digit, num_digits, arena, aggregated_table, split_table, extended)
 
-    swap = False
+def expand(num_digits, arena, aggregated_table, split_table, extended, workers, deadline, seed=None, stats=None, value_limit=None):
+    """
+    Fügt der Ebene num_digits alle Verknüpfungen von zwei Termen aus niedrigeren Ebenen hinzu, siehe generate().
+    Werte, die es mit weniger Ziffern gibt, werden nicht aufgenommen, da alle Terme mit ihnen dominiert sind.
+    Mit seed wird zuerst die Ebene des normalen Modus übernommen. Sie enthält alle Werte, die +, -, * und / aus zwei Werten
+    der normalen Ebenen bilden und nicht dominiert sind, für solche Paare müssen also nur noch Potenzen gebildet werden.
+    """
+    current_split_table = split_table[num_digits]
+
+    if seed is not None:
+        normal, seeded = seed
+        for value, index in level_items(normal.arena, normal.split_table[num_digits]):
+            op, left, right = normal.arena.ops[index], normal.arena.left[index], normal.arena.right[index]
+            # Die Zahl aus num_digits Ziffern ist schon in der Ebene. Fehlt ein Operand, ist er und damit auch dieser Term dominiert.
+            if op != TermArena.OP_NUMBER and left in seeded and right in seeded:
+                add_to_table(arena, current_split_table, op, seeded[left], seeded[right], value, num_digits, extended, aggregated_table)
 
     for op1_num_digits in range(1, num_digits // 2 + 1):
         op2_num_digits = num_digits - op1_num_digits
-        for op1_k in split_table[op1_num_digits]:
-            op1_v = split_table[op1_num_digits][op1_k][0]
-            for op2_k in split_table[op2_num_digits]:
-                op2_v = split_table[op2_num_digits][op2_k][0]
-                # Make sure that op1_k > op2_k
-                if op1_k < op2_k:
-                    op1_k, op2_k = op2_k, op1_k
-                    op1_v, op2_v = op2_v, op1_v
-                    swap = True
-
-                add_to_table(BinaryOperation(op1_v, op2_v, BinaryOperation.OP_ADD), current_split_table, extended)
-                add_to_table(BinaryOperation(op1_v, op2_v, BinaryOperation.OP_SUB), current_split_table, extended)
-                add_to_table(BinaryOperation(op2_v, op1_v, BinaryOperation.OP_SUB), current_split_table, extended)
-                add_to_table(BinaryOperation(op1_v, op2_v, BinaryOperation.OP_MULT), current_split_table, extended)
-                if extended and op1_k >= 2 and op2_k >= 2:
-
-                    try:
-                        if math.floor(op2_k * math.log(op1_k, 10)) + 1 <= MAX_DIGITS:
-                            add_to_table(BinaryOperation(op1_v, op2_v, BinaryOperation.OP_POW), current_split_table, extended)
-                    except OverflowError:
-                        print("overflow at power", op1_k, op2_k, file=sys.stderr)
-
-                    try:
-                        if math.floor(op1_k * math.log(op2_k, 10)) + 1 <= MAX_DIGITS:
-                            add_to_table(BinaryOperation(op2_v, op1_v, BinaryOperation.OP_POW), current_split_table, extended)
-                    except OverflowError:
-                        print("overflow at power", op1_k, op2_k, file=sys.stderr)
-
-                if op2_k != 0:
-                    try:
-                        res = op1_k / op2_k
-                        resint = int(res)
-                        if res == resint:
-                            add_to_table(BinaryOperation(op1_v, op2_v, BinaryOperation.OP_DIV), current_split_table, extended)
-                    except OverflowError:
-                        print("overflow at division", op1_k, op2_k, file=sys.stderr)
-
-                if swap:
-                    op1_k, op2_k = op2_k, op1_k
-                    op1_v, op2_v = op2_v, op1_v
-                    swap = False
-    if debug:
-        print("generated split table with digits:", num_digits, file=sys.stderr)
+        symmetric = op1_num_digits == op2_num_digits
+        op1_items = level_items(arena, split_table[op1_num_digits])
+        if symmetric:
+            operands = [(op1_items, op1_num_digits, op1_items, op2_num_digits)]
+        elif isinstance(split_table[op2_num_digits], SpilledLevel):
+            # Die ausgelagerte größere Ebene wird stückweise gelesen und ist dabei der äußere Operand
+            operands = ((chunk, op2_num_digits, op1_items, op1_num_digits) for chunk in split_table[op2_num_digits].chunks(arena))
+        else:
+            operands = [(op1_items, op1_num_digits, level_items(arena, split_table[op2_num_digits]), op2_num_digits)]
+        if seed is not None:
+            normal_values = {n: normal.values(n) for n in (op1_num_digits, op2_num_digits)}
 
-    for k in split_table[num_digits]:
+        for outer_items, outer_num_digits, inner_items, inner_num_digits in operands:
+            if seed is None:
+                results = combine_all(outer_items, inner_items, current_split_table, extended, workers, deadline, symmetric=symmetric)
+            else:
+                outer_normal, outer_other = partition(outer_items, normal_values[outer_num_digits])
+                inner_normal, inner_other = partition(inner_items, normal_values[inner_num_digits])
+                results = itertools.chain(
+                    combine_all(outer_normal, inner_normal, current_split_table, extended, workers, deadline, basic=False, symmetric=symmetric),
+                    combine_all(outer_normal, inner_other, current_split_table, extended, workers, deadline))
+                if symmetric:
+                    # Die Paare aus outer_other und inner_normal sind schon als Paare aus outer_normal und inner_other verknüpft
+                    results = itertools.chain(results, combine_all(outer_other, inner_other, current_split_table, extended, workers, deadline, symmetric=True))
+                else:
+                    results = itertools.chain(results, combine_all(outer_other, inner_items, current_split_table, extended, workers, deadline))
+            merge_results(results, num_digits, arena, aggregated_table, current_split_table, extended, stats, value_limit)
+
+def merge_results(results, num_digits, arena, aggregated_table, current_split_table, extended, stats, value_limit):
+    """
+    Übernimmt die Ergebnisse von combine_all() in die Ebene current_split_table, sobald sie fertig sind: der erste Term für einen Wert gewinnt.
+    """
+    for result, evaluated in results:
+        accepted = pruned = cut = 0
+        for value, op, left, right in result:
+            # Die aggregierte Tabelle enthält hier nur Werte mit weniger Ziffern, außer der Zahl aus num_digits Ziffern
+            # und ihren Fakultäten, die aber schon in der Ebene sind und daher nicht in result sein können
+            if value in aggregated_table:
+                pruned += 1
+            elif value_limit is not None and abs(value) > value_limit and factorial_root(value) is None:
+                cut += 1
+            elif add_to_table(arena, current_split_table, op, left, right, value, num_digits, extended, aggregated_table) != -1:
+                accepted += 1
+        if stats is not None:
+            for op, count in enumerate(evaluated):
+                stats['evaluated'][TermArena.OPCHARS[op]] += count
+            stats['accepted'] += accepted
+            stats['pruned'] += pruned
+            stats['cut'] += cut
+            stats['rejected'] += sum(evaluated) - accepted
+
+def partition(items, values):
+    """
+    Teilt items (Liste von (Wert, Index)) in die Einträge, deren Wert in values ist, und die übrigen.
+    """
+    inside = [item for item in items if item[0] in values]
+    outside = [item for item in items if item[0] not in values]
+    return inside, outside
+
+def combine_all(op1_items, op2_items, known, extended, workers, deadline, basic=True, symmetric=False):
+    """
+    Wie combine() für alle Paare, aber in Stücken von höchstens CHUNK_PAIRS Paaren und ab PARALLEL_MIN_PAIRS Paaren auf workers Prozesse verteilt.
+    Gibt die Ergebnisse der Stücke in ihrer Reihenfolge zurück, sobald sie fertig sind. Werden sie dabei schon in known übernommen,
+    bilden die folgenden Stücke eines Prozesses nur noch Werte, die noch fehlen. So liegen nie die Kandidaten der ganzen Ebene im Speicher.
+    """
+    global _combine_args
+
+    pairs = len(op1_items) * len(op2_items)
+    if workers > 1 and pairs >= PARALLEL_MIN_PAIRS:
+        chunks = max(workers * 4, -(-pairs // CHUNK_PAIRS))
+        bounds = [(pairs * c // chunks, pairs * (c + 1) // chunks) for c in range(chunks)]
+        _combine_args = (op1_items, op2_items, known, extended, deadline, basic, symmetric)
+        # Erst hier importiert, der Start von Aufrufen ohne Prozesse bleibt damit schneller
+        import multiprocessing
+        try:
+            with multiprocessing.get_context('fork').Pool(workers) as pool:
+                yield from pool.imap(_combine_range, bounds)
+        finally:
+            _combine_args = None
+        return
+    for start in range(0, max(pairs, 1), CHUNK_PAIRS):
+        yield combine(op1_items, op2_items, known, extended, start=start, end=min(start + CHUNK_PAIRS, pairs), deadline=deadline, basic=basic, symmetric=symmetric)
+
+def aggregate(digit, num_digits, arena, aggregated_table, split_table, extended):
+    """
+    Übernimmt die fertige Ebene num_digits der split_table in die aggregierte Tabelle.
+    Die fertige Ebene wird danach nur noch als Array der Indizes ihrer Terme gespeichert, da in ihr nichts mehr gesucht wird.
+    """
+    level = split_table[num_digits]
+    for k in level:
         if k not in aggregated_table:
-            aggregated_table[k] = split_table[num_digits][k]
+            aggregated_table[k] = level[k]
+    split_table[num_digits] = array('i', level.values())
 
     # Add 3, 33, 333 etc. Scan mit m Ziffern erwartet, dass die Zahl, die m+1 mal die Ziffer enthält, bereits eingetragen ist.
+    # Die Ebene num_digits+1 ist noch leer, enthält danach also nur diese Zahl und ihre Fakultäten, die noch nicht aggregiert sein können.
     num = int(str(digit)*(num_digits+1))
-    add_to_table(Number(num), next_split_table, extended)
-    add_to_table(Number(num), aggregated_table, extended)
+    add_to_table(arena, split_table[num_digits+1], TermArena.OP_NUMBER, -1, -1, num, num_digits+1, extended)
+    for k in split_table[num_digits+1]:
+        if k not in aggregated_table:
+            aggregated_table[k] = split_table[num_digits+1][k]
 
 
     return aggregated_table, split_table
 
-def scan(number, digit, aggregated_table, extended):
+
+class TableStore(object):
+    """
+    Speichert die Ebenen der split_table auf der Festplatte, da sie nur von der Ziffer und dem Modus abhängen, nicht von der gesuchten Zahl.
+    Jede Ebene liegt in einer eigenen Datei, die über (Version, MAX_DIGITS, Ziffer, Modus, Ebene) gefunden wird.
+    Eine Datei enthält die Arrays der Terme, die generate() für die Ebene in die Arena eingefügt hat, und die Indizes der Ebene.
+    Die Werte werden beim Laden aus den Operanden berechnet.
+    """
+
+    MAGIC = b'GBTABLE'
+    # Magic, Version, MAX_DIGITS, Ziffer, Modus, Ebene, erster Index, Anzahl Terme, Anzahl Einträge der Ebene
+    HEADER = struct.Struct('=7sHHBBHQQQ')
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, digit, mode, num_digits):
+        return os.path.join(self.directory, 'v{}-max{}'.format(CACHE_VERSION, MAX_DIGITS), '{}-{}'.format(digit, mode), '{}.bin'.format(num_digits))
+
+    def load(self, tables, num_digits):
+        """
+        Lädt die Ebene num_digits der Tabellen tables, falls sie gespeichert ist, und aggregiert sie wie generate().
+        Die Ebenen darunter müssen bereits in der Arena sein. Gibt zurück, ob die Ebene geladen wurde.
+        """
+        digit, arena = tables.digit, tables.arena
+        try:
+            with open(self.path(digit, tables.mode, num_digits), 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    header = TableStore.HEADER.unpack_from(m, 0)
+                    if header[:6] != (TableStore.MAGIC, CACHE_VERSION, MAX_DIGITS, digit, Tables.MODES.index(tables.mode), num_digits):
+                        return False
+                    start, count, size = header[6:]
+                    if start != len(arena):
+                        return False
+                    # Abgeschnittene Dateien werden erkannt, bevor etwas in die Arena übernommen wird
+                    if len(m) != TableStore.HEADER.size + count * (1 + 4 + 4 + 2) + size * 4:
+                        return False
+                    offset = TableStore.HEADER.size
+                    columns = []
+                    for typecode, n in (('b', count), ('i', count), ('i', count), ('H', count), ('i', size)):
+                        column = array(typecode)
+                        column.frombytes(m[offset:offset + n * column.itemsize])
+                        offset += n * column.itemsize
+                        columns.append(column)
+        except (OSError, ValueError, struct.error):
+            return False
+
+        ops, left, right, digits, indices = columns
+        arena.ops.extend(ops)
+        arena.left.extend(left)
+        arena.right.extend(right)
+        arena.digits.extend(digits)
+        for index in range(start, start + count):
+            arena.values.append(arena.evaluate(index))
+        arena.levels[num_digits] = (start, start + count)
+
+        tables.split_table[num_digits] = {arena.values[index]: index for index in indices}
+        aggregate(digit, num_digits, arena, tables.aggregated_table, tables.split_table, tables.extended)
+        return True
+
+    def save(self, tables, num_digits):
+        """
+        Speichert die fertig generierte Ebene num_digits der Tabellen tables.
+        """
+        digit, arena = tables.digit, tables.arena
+        start, end = arena.levels[num_digits]
+        indices = tables.split_table[num_digits]
+
+        path = self.path(digit, tables.mode, num_digits)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Erst vollständig schreiben, dann umbenennen, damit parallele Läufe nie eine halbe Datei lesen
+        tmp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp, 'wb') as f:
+            f.write(TableStore.HEADER.pack(TableStore.MAGIC, CACHE_VERSION, MAX_DIGITS, digit, Tables.MODES.index(tables.mode), num_digits, start, end - start, len(indices)))
+            for column in (arena.ops, arena.left, arena.right, arena.digits):
+                f.write(column[start:end].tobytes())
+            f.write(indices.tobytes())
+        os.replace(tmp, path)
+
+def scan(number, digit, arena, aggregated_table, extended):
     """
     Sucht für jeden Term der Tabelle nach einem Partner, mit dem zusammen durch eine Rechenoperation die gegebene Zahl number erhalten wird.
     Falls extended, werden auch Fakultäts- und Potenzfunktionen benutzt.
     """
+    def term(value):
+        return arena.term(aggregated_table[value])
+
     results = set()
     if number in aggregated_table:
-        results.add(aggregated_table[number][0])
+        results.add(term(number))
 
     for j in aggregated_table:
         if number - j in aggregated_table:
-            results.add(BinaryOperation(aggregated_table[j][0], aggregated_table[number-j][0], BinaryOperation.OP_ADD))
+            results.add(BinaryOperation(term(j), term(number-j), BinaryOperation.OP_ADD))
         if number + j in aggregated_table:
-            results.add(BinaryOperation(aggregated_table[number+j][0], aggregated_table[j][0], BinaryOperation.OP_SUB))
+            results.add(BinaryOperation(term(number+j), term(j), BinaryOperation.OP_SUB))
         if j - number in aggregated_table:
-            results.add(BinaryOperation(aggregated_table[j][0], aggregated_table[j-number][0], BinaryOperation.OP_SUB))
+            results.add(BinaryOperation(term(j), term(j-number), BinaryOperation.OP_SUB))
         
         if j != 0:
             if (number*j) in aggregated_table:
-                results.add(BinaryOperation(aggregated_table[number*j][0], aggregated_table[j][0], BinaryOperation.OP_DIV))
+                results.add(BinaryOperation(term(number*j), term(j), BinaryOperation.OP_DIV))
             
-            res = j / number
-            resint = int(res)
-            if res == resint and resint in aggregated_table:
-                results.add(BinaryOperation(aggregated_table[j][0], aggregated_table[resint][0], BinaryOperation.OP_DIV))
-        
-            res = number / j
-            resint = int(res)
-            if res == resint and resint in aggregated_table:
-                results.add(BinaryOperation(aggregated_table[number/j][0], aggregated_table[j][0], BinaryOperation.OP_MULT))
-        
-        if extended and number > 1 and j > 1:
-            res = number ** (1/j)
-            if res in aggregated_table and res != 1.0:
-                results.add(BinaryOperation(aggregated_table[res][0], aggregated_table[j][0], BinaryOperation.OP_POW))
-            res = math.log(number, j)
-            if res in aggregated_table:
-                results.add(BinaryOperation(aggregated_table[j][0], aggregated_table[res][0], BinaryOperation.OP_POW))
+            if number != 0 and j % number == 0 and j // number in aggregated_table:
+                results.add(BinaryOperation(term(j), term(j // number), BinaryOperation.OP_DIV))
         
+            if number % j == 0 and number // j in aggregated_table:
+                results.add(BinaryOperation(term(number // j), term(j), BinaryOperation.OP_MULT))
 
-    if extended and j >= 3 and j <= 60 and j in FACTORIALS and FACTORIALS[j] in aggregated_table:
-        results.add(UnaryOperation(aggregated_table[FACTORIALS[j]][0], UnaryOperation.OP_FAC))
-        
+    if extended:
+        for root, exponent in perfect_powers(number):
+            if root in aggregated_table and exponent in aggregated_table:
+                results.add(BinaryOperation(term(root), term(exponent), BinaryOperation.OP_POW))
+
+    root = factorial_root(number) if extended else None
+    if root is not None and root in aggregated_table:
+        results.add(UnaryOperation(term(root), UnaryOperation.OP_FAC))
 
-    if len(results) == 0:
-        return None
+    return shortest(results)
 
-    # Use term with fewest digits. If there are multiple terms with the same number of digits, use the one that has fewer characters
-    res = 0
+def shortest(terms):
+    """
+    Wählt den Term mit den wenigsten Ziffern aus. Bei gleich vielen Ziffern wird der Term mit weniger Zeichen gewählt.
+    Gibt None zurück, falls es keinen Term gibt.
+    """
+    res = None
     n = math.inf
     c = math.inf
-    for r in results:
+    for r in terms:
         nr = r.number_of_digits()
-        nc = len(str(res))
-        if nr < n or (nr == n and nc < c):
+        if nr > n:
+            continue
+        nc = len(str(r))
+        if nr < n or nc < c:
             res = r
             n = nr
             c = nc
     return res
 
-def find_shortest(number, digit, extended, debug=False):
+
+def inverse_partners(number, x, extended):
     """
-    Findet den kürzesten Term, der die Zahl number nur durch die Ziffer digit repräsentiert.
-    Sucht für jeden Term der Tabelle nach einem Partner, mit dem zusammen durch eine Rechenoperation die gegebene Zahl number erhalten wird.
-    Falls extended, werden auch Fakultäts- und Potenzfunktionen benutzt.
+    Gibt alle (y, Operation, links) zurück, für die (y op x) den Wert number hat (links wahr) bzw. (x op y).
+    Falls extended, werden auch Potenzen aufgelöst.
     """
-    aggregated_table = {}
-    split_table = defaultdict(dict)
+    res = [(number - x, BinaryOperation.OP_ADD, True),
+           (number + x, BinaryOperation.OP_SUB, True),
+           (x - number, BinaryOperation.OP_SUB, False)]
+    if x != 0:
+        if number % x == 0:
+            res.append((number // x, BinaryOperation.OP_MULT, True))
+        res.append((number * x, BinaryOperation.OP_DIV, True))
+        if number != 0 and x % number == 0:
+            res.append((x // number, BinaryOperation.OP_DIV, False))
+    if extended and x >= 2:
+        for root, exponent in perfect_powers(number):
+            if exponent == x:
+                res.append((root, BinaryOperation.OP_POW, True))
+            if root == x:
+                res.append((exponent, BinaryOperation.OP_POW, False))
+    return res
+
+
+def unfold(number, extended):
+    """
+    Gibt (Wert, Anzahl Fakultäten) für number und, falls extended, für die Werte zurück, deren Fakultät (der Fakultät ...) number ist.
+    """
+    res = [(number, 0)]
+    root = factorial_root(number) if extended else None
+    while root is not None:
+        res.append((root, len(res)))
+        root = factorial_root(root)
+    return res
+
+
+def factorials(term, count):
+    """
+    Gibt den Term zurück, auf den count mal die Fakultätsfunktion angewendet ist.
+    """
+    for _ in range(count):
+        term = UnaryOperation(term, UnaryOperation.OP_FAC)
+    return term
+
+
+class ScanIndex(object):
+    """
+    Die Werte der aggregierten Tabelle als sortierte NumPy-Arrays, damit scan() die Partner aller Werte mit wenigen vektorisierten Operationen sucht.
+    Werte mit kleinerem Betrag als SCAN_INT_LIMIT werden exakt als int64 verarbeitet.
+    Für größere Werte wird zuerst vektorisiert in einem Bitfeld geprüft, ob der Fingerabdruck (Wert modulo FINGERPRINT_PRIME)
+    des gesuchten Partners in der Tabelle vorkommen kann, nur dann wird der Partner exakt in Python berechnet und gesucht.
+    """
+
+    # Fingerabdrücke sind kleiner als 2^31, Produkte von zwei Fingerabdrücken passen also in int64
+    FINGERPRINT_PRIME = 2 ** 31 - 1
+    # Bits im Bitfeld pro Wert der Tabelle, bestimmt den Anteil der Fingerabdrücke, die zufällig getroffen werden
+    FINGERPRINT_BITS = 256
+
+    def __init__(self, arena, aggregated_table, directory=None):
+        self.arena = arena
+        self.aggregated_table = aggregated_table
+        # Falls gesetzt (siehe spill()), werden die Arrays nach jeder Aktualisierung aus Dateien in diesem Verzeichnis in den Speicher abgebildet
+        self.directory = directory
+        # Kleine Werte (sortiert), Indizes ihrer Terme in der Arena und ihre Ziffern
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int64)
+        self.digits = np.zeros(0, dtype=np.int64)
+        # Große Werte, ihre Fingerabdrücke, Arena-Indizes und Ziffern
+        self.big = []
+        self.big_fingerprints = np.zeros(0, dtype=np.int64)
+        self.big_indices = np.zeros(0, dtype=np.int64)
+        self.big_digits = np.zeros(0, dtype=np.int64)
+        # Fingerabdrücke aller Werte, Bitfeld über ihre unteren Bits
+        self.fingerprints = np.zeros(0, dtype=np.int64)
+        self.bitmap = np.zeros(1, dtype=np.uint8)
+        self.mask = 7
+        # Anzahl der Einträge der aggregierten Tabelle, die schon übernommen wurden
+        self.size = 0
+
+    def update(self):
+        """
+        Übernimmt die Einträge, die seit dem letzten Aufruf zur aggregierten Tabelle hinzugekommen sind.
+        Die aggregierte Tabelle wächst nur, ihre Einträge werden nie ersetzt.
+        """
+        if self.size == len(self.aggregated_table):
+            return
+        keys = []
+        indices = []
+        big = []
+        big_indices = []
+        # Ausgelagerte Einträge einer AggregatedTable sind schon übernommen und stehen nicht mehr im Dictionary
+        position = self.size - getattr(self.aggregated_table, 'spilled', 0)
+        for k, index in itertools.islice(dict.items(self.aggregated_table), position, None):
+            if -SCAN_INT_LIMIT < k < SCAN_INT_LIMIT:
+                keys.append(k)
+                indices.append(index)
+            else:
+                big.append(k)
+                big_indices.append(index)
+        self.size = len(self.aggregated_table)
+
+        keys = np.array(keys, dtype=np.int64)
+        big_fingerprints = np.array([k % ScanIndex.FINGERPRINT_PRIME for k in big], dtype=np.int64)
+        self.fingerprints = np.concatenate((self.fingerprints, keys % ScanIndex.FINGERPRINT_PRIME, big_fingerprints))
+        bits = min(max(8, 1 << (len(self.fingerprints) * ScanIndex.FINGERPRINT_BITS - 1).bit_length()), 1 << 31)
+        self.mask = bits - 1
+        self.bitmap = np.zeros(bits // 8, dtype=np.uint8)
+        masked = self.fingerprints & self.mask
+        np.bitwise_or.at(self.bitmap, masked >> 3, np.left_shift(1, masked & 7).astype(np.uint8))
+        self.big.extend(big)
+        self.big_fingerprints = np.concatenate((self.big_fingerprints, big_fingerprints))
+        self.big_indices = np.concatenate((self.big_indices, np.array(big_indices, dtype=np.int64)))
+        self.big_digits = np.concatenate((self.big_digits, np.array([self.arena.digits[index] for index in big_indices], dtype=np.int64)))
+
+        keys = np.concatenate((self.keys, keys))
+        indices = np.concatenate((self.indices, np.array(indices, dtype=np.int64)))
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.indices = indices[order]
+        self.digits = np.array([self.arena.digits[index] for index in self.indices], dtype=np.int64)
 
-    # Bei 0 beginnen, dass generate() die Ziffer als Zahl der Tabelle hinzufügt
-    i = 0
-    res_n = math.inf
+        if self.directory is not None:
+            self.spill(self.directory)
+
+    def spill(self, directory):
+        """
+        Lagert die Arrays in Dateien im Verzeichnis directory aus, auch nach jeder weiteren Aktualisierung.
+        """
+        self.directory = directory
+        for name in ('keys', 'indices', 'digits', 'fingerprints', 'bitmap', 'big_fingerprints', 'big_indices', 'big_digits'):
+            setattr(self, name, spill_array(os.path.join(directory, 'index-' + name), getattr(self, name)))
+
+    def partners(self, values, positions):
+        """
+        Sucht für jede Position aus positions den Wert values an dieser Position unter den kleinen Werten.
+        Gibt die Positionen, für die ein Partner gefunden wurde, die Arena-Indizes der Partner und deren Ziffern zurück.
+        Werte außerhalb des int64-Bereichs werden über die Fingerabdrücke unter den großen Werten gesucht.
+        """
+        values = values[positions]
+        small = np.abs(values) < SCAN_INT_LIMIT
+
+        pos = np.searchsorted(self.keys, values[small])
+        pos[pos == len(self.keys)] = 0
+        hit = self.keys[pos] == values[small]
+        found = positions[small][hit]
+        indices = self.indices[pos[hit]]
+        digits = self.digits[pos[hit]]
+
+        outside = positions[~small]
+        if len(outside) == 0:
+            return found, indices, digits
+        big_found, big_indices, big_digits = self.lookup(outside, values[~small] % ScanIndex.FINGERPRINT_PRIME, lambda j, v: int(v), values[~small])
+        return np.concatenate((found, big_found)), np.concatenate((indices, big_indices)), np.concatenate((digits, big_digits))
+
+    def lookup(self, positions, fingerprints, partner, operands):
+        """
+        Prüft für jede Position, ob der Fingerabdruck fingerprints des gesuchten Partners vorkommen kann.
+        Nur dann wird der Partner mit partner(Position, Operand aus operands) exakt berechnet (None, falls es keinen gibt) und in der Tabelle gesucht.
+        """
+        masked = fingerprints & self.mask
+        hit = (self.bitmap[masked >> 3] >> (masked & 7)) & 1
+        found = []
+        indices = []
+        for i in np.nonzero(hit)[0]:
+            v = partner(positions[i], operands[i])
+            if v is not None and v in self.aggregated_table:
+                found.append(positions[i])
+                indices.append(self.aggregated_table[v])
+        return np.array(found, dtype=np.int64), np.array(indices, dtype=np.int64), np.array([self.arena.digits[index] for index in indices], dtype=np.int64)
+
+    def scan(self, number, extended):
+        """
+        Wie scan(), number muss aber einen kleineren Betrag als SCAN_INT_LIMIT haben.
+        Alle Teilbarkeits-, Wurzel- und Logarithmus-Prüfungen sind exakt.
+        """
+        self.update()
+        arena = self.arena
+        n = number
+        K = self.keys
+        everything = np.arange(len(K))
+
+        # (Operation, Arena-Indizes der linken Operanden, der rechten Operanden, Ziffern der Terme)
+        candidates = []
+
+        def add(op, j, partner, partner_digits, partner_left, j_indices=self.indices, j_digits=self.digits):
+            if len(j) == 0:
+                return
+            if partner_left:
+                candidates.append((op, partner, j_indices[j], partner_digits + j_digits[j]))
+            else:
+                candidates.append((op, j_indices[j], partner, j_digits[j] + partner_digits))
+
+        # j + (number-j), (number+j) - j, j - (j-number)
+        add(BinaryOperation.OP_ADD, *self.partners(n - K, everything), False)
+        add(BinaryOperation.OP_SUB, *self.partners(n + K, everything), True)
+        add(BinaryOperation.OP_SUB, *self.partners(K - n, everything), False)
+
+        nonzero = K != 0
+        # (number*j) / j, Produkte außerhalb des int64-Bereichs werden über die Fingerabdrücke gesucht
+        safe = nonzero & (np.abs(K) <= SCAN_INT_LIMIT // max(abs(n), 1))
+        add(BinaryOperation.OP_DIV, *self.partners(n * np.where(safe, K, 0), np.nonzero(safe)[0]), True)
+        unsafe = np.nonzero(nonzero & ~safe)[0]
+        add(BinaryOperation.OP_DIV, *self.lookup(unsafe, n % ScanIndex.FINGERPRINT_PRIME * (K[unsafe] % ScanIndex.FINGERPRINT_PRIME) % ScanIndex.FINGERPRINT_PRIME, lambda j, k: n * int(k), K[unsafe]), True)
+
+        if n != 0:
+            # j / (j/number)
+            divisible = nonzero & (K % n == 0)
+            add(BinaryOperation.OP_DIV, *self.partners(K // n, np.nonzero(divisible)[0]), False)
+            # (number/j) * j
+            divisor = np.where(nonzero, K, 1)
+            divisible = nonzero & (n % divisor == 0)
+            add(BinaryOperation.OP_MULT, *self.partners(n // divisor, np.nonzero(divisible)[0]), True)
+
+        if extended:
+            for root, exponent in perfect_powers(n):
+                if root in self.aggregated_table and exponent in self.aggregated_table:
+                    left = self.aggregated_table[root]
+                    right = self.aggregated_table[exponent]
+                    candidates.append((BinaryOperation.OP_POW, np.array([left]), np.array([right]), np.array([arena.digits[left] + arena.digits[right]])))
+
+        # Große Werte j als Operand. Potenzen sind hier nicht möglich und number/j ist nur für number == 0 ganzzahlig.
+        if self.big:
+            p = ScanIndex.FINGERPRINT_PRIME
+            F = self.big_fingerprints
+            nf = n % p
+            big = np.arange(len(self.big))
+            add_big = lambda op, found, partner_left: add(op, *found, partner_left, j_indices=self.big_indices, j_digits=self.big_digits)
+            add_big(BinaryOperation.OP_ADD, self.lookup(big, (nf - F) % p, lambda j, k: n - k, self.big), False)
+            add_big(BinaryOperation.OP_SUB, self.lookup(big, (nf + F) % p, lambda j, k: n + k, self.big), True)
+            add_big(BinaryOperation.OP_SUB, self.lookup(big, (F - nf) % p, lambda j, k: k - n, self.big), False)
+            add_big(BinaryOperation.OP_DIV, self.lookup(big, nf * F % p, lambda j, k: n * k, self.big), True)
+            if nf != 0:
+                # (j/number) hat den Fingerabdruck f_j * nf^-1, falls number ein Teiler von j ist
+                add_big(BinaryOperation.OP_DIV, self.lookup(big, F * pow(nf, -1, p) % p, lambda j, k: k // n if k % n == 0 else None, self.big), False)
+            elif n != 0:
+                found = [b for b, k in enumerate(self.big) if k % n == 0 and k // n in self.aggregated_table]
+                indices = [self.aggregated_table[self.big[b] // n] for b in found]
+                add_big(BinaryOperation.OP_DIV, (np.array(found, dtype=np.int64), np.array(indices, dtype=np.int64), np.array([arena.digits[index] for index in indices], dtype=np.int64)), False)
+            if n == 0 and 0 in self.aggregated_table:
+                zero = self.aggregated_table[0]
+                add_big(BinaryOperation.OP_MULT, (big, np.full(len(big), zero), np.full(len(big), arena.digits[zero])), True)
+
+        # Nur die Kandidaten mit den wenigsten Ziffern werden als Terme gebaut
+        results = []
+        if n in self.aggregated_table:
+            results.append(arena.term(self.aggregated_table[n]))
+        root = factorial_root(n) if extended else None
+        if root is not None and root in self.aggregated_table:
+            results.append(UnaryOperation(arena.term(self.aggregated_table[root]), UnaryOperation.OP_FAC))
+
+        best = min([r.number_of_digits() for r in results] + [int(c[3].min()) for c in candidates], default=None)
+        if best is None:
+            return None
+        for op, left, right, digits in candidates:
+            for i in np.nonzero(digits == best)[0]:
+                results.append(BinaryOperation(arena.term(int(left[i])), arena.term(int(right[i])), op))
+        return shortest(results)
+
+
+class SearchStats(object):
+    """
+    Sammelt für jede Ebene der Tabellen die Zeit in generate() und scan(), die je Operation berechneten Kandidaten,
+    die von add_to_table() übernommenen und verworfenen Kandidaten, die als dominiert verworfenen neuen Werte, die Größe der Tabellen und den höchsten Speicherverbrauch.
+    """
+
+    def __init__(self):
+        # Ebene -> Dictionary der Messwerte
+        self.levels = {}
+
+    def level(self, num_digits):
+        if num_digits not in self.levels:
+            self.levels[num_digits] = {
+                'generate_seconds': 0.0,
+                'scan_seconds': 0.0,
+                'loaded': False,
+                'evaluated': dict.fromkeys(TermArena.OPCHARS, 0),
+                'accepted': 0,
+                'rejected': 0,
+                'pruned': 0,
+                'cut': 0,
+                'level_size': 0,
+                'table_size': 0,
+                'terms': 0,
+                'peak_rss_kb': 0,
+            }
+        return self.levels[num_digits]
+
+    def as_dict(self):
+        """
+        Gibt die Messwerte als Dictionary zurück, das direkt als JSON ausgegeben werden kann.
+        """
+        levels = []
+        for num_digits in sorted(self.levels):
+            level = dict(level=num_digits, **self.levels[num_digits])
+            # Anteil der neuen Werte, die verworfen wurden, weil es sie mit weniger Ziffern gibt
+            level['pruned_rate'] = level['pruned'] / max(level['pruned'] + level['accepted'], 1)
+            levels.append(level)
+        return {'levels': levels}
+
+    def total(self, key):
+        """
+        Gibt die Summe des Messwerts key über alle Ebenen zurück.
+        """
+        return sum(level[key] for level in self.levels.values())
+
+
+def peak_rss():
+    """
+    Gibt den höchsten Speicherverbrauch (resident set size) dieses Prozesses in KiB zurück, 0 falls unbekannt.
+    """
+    try:
+        import resource
+    except ImportError:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+# Ab so vielen Paaren von Operanden in der nächsten Ebene sucht Tables.search() auch rückwärts, statt die Ebene zu generieren
+INVERSE_MIN_PAIRS = 100000
+
+class Tables(object):
+    """
+    Die Tabellen aller Terme aus einer Ziffer, die von allen gesuchten Zahlen gemeinsam benutzt werden.
+    Die Ebenen werden erst generiert (oder aus store geladen), wenn sie mit grow() angefordert werden.
+    Erweiterte Tabellen können die normalen Tabellen seed derselben Ziffer als Grundlage benutzen, die dann mitwachsen.
+    Die erweiterte Ebene übernimmt die normale Ebene und bildet für Paare aus zwei normalen Werten nur noch Potenzen.
+    Mit value_limit enthalten die Tabellen nur Werte bis zu diesem Betrag, siehe generate(). seed muss dann das gleiche value_limit haben.
+    Mit memory_limit (Bytes) werden vor jeder neuen Ebene die ältesten fertigen Ebenen in ein temporäres Verzeichnis in spill
+    (Standard: das temporäre Verzeichnis des Systems) ausgelagert, bis die übrigen Terme und die geschätzte neue Ebene in das Budget passen.
+    Die Ebene 1 bleibt immer im Speicher. Ausgelagerte Ebenen verknüpft generate() in anderer Reihenfolge, die Ebenen enthalten also
+    die gleichen Werte, aber möglicherweise andere, gleich lange Terme. Mit value_limit oder memory_limit wird store daher nicht benutzt.
+    """
+
+    # Modi, für die TableStore die Ebenen getrennt speichert. Mit seed ist die Reihenfolge der Terme eine andere.
+    MODES = ('normal', 'extended', 'seeded')
+
+    def __init__(self, digit, extended, store=None, debug=False, workers=1, seed=None, stats=None, value_limit=None, memory_limit=None, spill=None):
+        self.digit = digit
+        self.extended = extended
+        self.value_limit = value_limit
+        # Die gespeicherten Ebenen sind ohne Wertebereich und ohne Auslagern generiert. Mit ausgelagerten Ebenen verknüpft generate()
+        # in anderer Reihenfolge, die Terme einer Ebene stimmen dann nicht mit den gespeicherten Indizes der Ebenen darunter überein.
+        self.store = store if value_limit is None and memory_limit is None else None
+        self.debug = debug
+        self.workers = workers
+        self.seed = seed
+        # SearchStats oder None
+        self.stats = stats
+        # Index eines Terms in seed -> Index des Terms mit gleichem Wert und gleich vielen Ziffern
+        self.seeded = {}
+        self.arena = TermArena()
+        self.split_table = defaultdict(dict)
+        self.memory_limit = memory_limit
+        self.spill_directory = None
+        if memory_limit is not None:
+            import shutil
+            import weakref
+            import tempfile
+            if spill is not None:
+                os.makedirs(spill, exist_ok=True)
+            self.spill_directory = tempfile.mkdtemp(prefix='geburtstag-{}-{}-'.format(digit, self.mode), dir=spill)
+            weakref.finalize(self, shutil.rmtree, self.spill_directory, True)
+            self.aggregated_table = AggregatedTable(self.spill_directory)
+        else:
+            self.aggregated_table = {}
+        # Der ScanIndex wird erst mit der ersten ausgelagerten Ebene ausgelagert, siehe spill()
+        self.index = ScanIndex(self.arena, self.aggregated_table)
+        # Höchste bereits fertige Ebene
+        self.num_digits = -1
+        # Ebene -> Menge der Werte, für seed
+        self.level_values = {}
+
+    @property
+    def mode(self):
+        if self.seed is not None:
+            return 'seeded'
+        return 'extended' if self.extended else 'normal'
+
+    def grow(self, num_digits, deadline=None):
+        """
+        Generiert alle Ebenen bis einschließlich num_digits, die noch fehlen.
+        Falls deadline (time.monotonic()) erreicht wird, bevor eine Ebene fertig ist, wird SearchTimeout ausgelöst.
+        Die bis dahin fertigen Ebenen bleiben erhalten.
+        """
+        while self.num_digits < num_digits:
+            i = self.num_digits + 1
+            if self.seed is not None:
+                self.seed.grow(i, deadline)
+            stats = self.stats.level(i) if self.stats is not None else None
+            if self.memory_limit is not None:
+                self.reduce(i)
+            begin = time.perf_counter()
+            if self.store is not None and self.store.load(self, i):
+                if self.debug:
+                    print("loaded split table with digits:", i, file=sys.stderr)
+                if stats is not None:
+                    stats['loaded'] = True
+            else:
+                seed = (self.seed, self.seeded) if self.seed is not None else None
+                generate(self.digit, i, self.arena, self.aggregated_table, self.split_table, self.extended,
+                         debug=self.debug, workers=self.workers, deadline=deadline, seed=seed, stats=stats, value_limit=self.value_limit)
+                if self.store is not None:
+                    self.store.save(self, i)
+            if self.seed is not None:
+                self.map_seed(i)
+            self.num_digits = i
+            if stats is not None:
+                stats['generate_seconds'] += time.perf_counter() - begin
+                stats['level_size'] = len(self.split_table[i])
+                stats['table_size'] = len(self.aggregated_table)
+                stats['terms'] = len(self.arena)
+                stats['peak_rss_kb'] = peak_rss()
+
+    def memory(self):
+        """
+        Gibt den geschätzten Speicherbedarf der Terme in Bytes zurück, die nicht ausgelagert sind.
+        """
+        return dict.__len__(self.aggregated_table) * TERM_BYTES
+
+    def reduce(self, num_digits):
+        """
+        Lagert die ältesten fertigen Ebenen aus, bis die übrigen Terme zusammen mit der Ebene num_digits in memory_limit passen.
+        Die Größe der neuen Ebene wird aus dem Wachstum der letzten beiden Ebenen geschätzt. Passt sie auch ohne alle
+        anderen Ebenen nicht, wird sie trotzdem generiert.
+        """
+        if num_digits < 3:
+            return
+        previous, last = len(self.split_table[num_digits - 2]), len(self.split_table[num_digits - 1])
+        expected = last * last // max(previous, 1) * TERM_BYTES
+        for n in range(2, num_digits):
+            if self.memory() + expected <= self.memory_limit:
+                break
+            if not isinstance(self.split_table[n], SpilledLevel):
+                self.spill(n)
+
+    def spill(self, num_digits):
+        """
+        Lagert die fertige Ebene num_digits aus: ihre Einträge der aggregierten Tabelle und ihre Werte in der Arena werden durch Dateien ersetzt.
+        Zahlen aus Ziffern (für render()) und Werte außerhalb von SCAN_INT_LIMIT bleiben im Speicher.
+        """
+        if self.debug:
+            print("spilling split table with digits:", num_digits, file=sys.stderr)
+        # Der ScanIndex muss alle Einträge übernommen haben, bevor sie aus dem Dictionary entfernt werden
+        self.index.update()
+        if self.index.directory is None:
+            self.index.spill(self.spill_directory)
+        arena = self.arena
+        level = self.split_table[num_digits]
+        values = []
+        keys = []
+        indices = []
+        for index in level:
+            v = arena.values[index]
+            if -SCAN_INT_LIMIT < v < SCAN_INT_LIMIT:
+                values.append(v)
+                if dict.get(self.aggregated_table, v) == index:
+                    keys.append(v)
+                    indices.append(index)
+                if arena.ops[index] != TermArena.OP_NUMBER:
+                    arena.values[index] = None
+            else:
+                values.append(0)
+        self.split_table[num_digits] = SpilledLevel(os.path.join(self.spill_directory, 'level-{}'.format(num_digits)), level, values)
+        self.aggregated_table.spill(keys, indices)
+        self.level_values.pop(num_digits, None)
+
+    def map_seed(self, num_digits):
+        """
+        Trägt die Terme der fertigen Ebene num_digits von seed in self.seeded ein.
+        """
+        level = dict(level_items(self.seed.arena, self.seed.split_table[num_digits]))
+        found = 0
+        # Die übernommenen Terme stehen am Anfang der Ebene
+        for index in self.split_table[num_digits]:
+            if found == len(level):
+                break
+            seed_index = level.get(self.arena.values[index])
+            if seed_index is not None:
+                self.seeded[seed_index] = index
+                found += 1
+
+    def values(self, num_digits):
+        """
+        Gibt die Menge der Werte der fertigen Ebene num_digits zurück.
+        """
+        level = self.split_table[num_digits]
+        if isinstance(level, SpilledLevel):
+            return {value for chunk in level.chunks(self.arena) for value, _ in chunk}
+        if num_digits not in self.level_values:
+            self.level_values[num_digits] = {self.arena.values[index] for index in level}
+        return self.level_values[num_digits]
+
+    def scan(self, number):
+        begin = time.perf_counter()
+        if -SCAN_INT_LIMIT < number < SCAN_INT_LIMIT:
+            res = self.index.scan(number, self.extended)
+        else:
+            res = scan(number, self.digit, self.arena, self.aggregated_table, self.extended)
+        if self.stats is not None:
+            self.stats.level(self.num_digits)['scan_seconds'] += time.perf_counter() - begin
+        return res
+
+    def scan_inverse(self, number):
+        """
+        Sucht Terme (Y op X) und (X op Y) für number, in denen X ein Term der Ebene 1 ist: für jedes X und jede Rechenoperation
+        wird rückwärts der Wert von Y berechnet und mit scan() gesucht, Fakultäten werden dabei ebenfalls rückwärts aufgelöst.
+        Y wird damit unter allen Termen mit bis zu num_digits + 1 Ziffern gefunden, ohne dass deren Ebene generiert ist.
+        Gibt den kürzesten gefundenen Term oder None zurück.
+        """
+        results = []
+        # Wert -> Ergebnis von scan(), viele Partner kommen mehrfach vor
+        found = {}
+        literal = int(str(self.digit) * (self.num_digits + 2))
+        for u, u_count in unfold(number, self.extended):
+            if u == literal:
+                results.append(factorials(Number(u), u_count))
+            for x_index in self.split_table[1]:
+                x_term = self.arena.term(x_index)
+                for y, op, y_left in inverse_partners(u, self.arena.values[x_index], self.extended):
+                    for w, w_count in unfold(y, self.extended):
+                        if w not in found:
+                            found[w] = self.scan(w)
+                        if found[w] is None:
+                            continue
+                        y_term = factorials(found[w], w_count)
+                        term = BinaryOperation(y_term, x_term, op) if y_left else BinaryOperation(x_term, y_term, op)
+                        results.append(factorials(term, u_count))
+        return shortest(results)
+
+    def next_pairs(self):
+        """
+        Gibt die Anzahl der Paare von Operanden zurück, die generate() für die nächste Ebene verknüpft.
+        """
+        n = self.num_digits + 1
+        return sum(len(self.split_table[a]) * len(self.split_table[n - a]) for a in range(1, n // 2 + 1))
+
+    def search(self, number, inverse=True):
+        """
+        Sucht den kürzesten Term für number mit den fertigen Ebenen, zuerst mit scan(), das alle Terme mit bis zu num_digits + 1 Ziffern abdeckt.
+        Ist der gefundene Term damit nicht bewiesen kürzest, wird falls inverse zusätzlich mit scan_inverse() gesucht, das eine Ziffer mehr abdeckt.
+        Das lohnt sich nur, wenn die nächste Ebene mindestens INVERSE_MIN_PAIRS Paare verknüpfen müsste.
+        Gibt (Term oder None, Ziffern) zurück: es gibt keinen Term mit höchstens so vielen Ziffern, der kürzer als der gefundene ist.
+        """
+        # scan() findet (A op B)! nur, wenn A op B schon in der Tabelle ist, deshalb wird auch der Wert unter der Fakultät gesucht
+        res = shortest([factorials(r, count) for u, count in unfold(number, self.extended) for r in [self.scan(u)] if r is not None])
+        covered = self.num_digits + 1
+        if not inverse or self.num_digits < 1 or res is not None and res.number_of_digits() <= covered + 1 \
+                or self.next_pairs() < INVERSE_MIN_PAIRS:
+            return res, covered
+        inverse = self.scan_inverse(number)
+        return shortest([r for r in (res, inverse) if r is not None]), covered + 1
+
+
+def find_shortest_batch(numbers, tables, debug=False):
+    """
+    Findet die kürzesten Terme für alle Zahlen aus numbers mit den gemeinsamen Tabellen tables.
+    Die Tabellen werden nur so weit generiert, wie es die noch offenen Zahlen erfordern.
+    Gibt (Zahl, Term) zurück, sobald für eine Zahl bewiesen ist, dass es keinen kürzeren Term gibt.
+    """
+    # Zahl -> Anzahl der Ziffern des bisher besten Terms
+    pending = dict.fromkeys(numbers, math.inf)
+    results = {}
+
+    # Bei 0 beginnen, dass generate() die Ziffer als Zahl der Tabelle hinzufügt. Bereits generierte Ebenen werden sofort ganz benutzt.
+    i = max(tables.num_digits, 0)
 
     # Generate tables until shortest result will be available with scan()
-    while i <= res_n - 2:
-        aggregated_table, split_table = generate(args.digit, i, aggregated_table, split_table, extended, debug=debug)
-        res = scan(number, digit, aggregated_table, extended)
-        if res is not None:
-            res_n = res.number_of_digits()
+    while pending:
+        tables.grow(i)
+        # Rückwärts wird nur gesucht, solange damit alle offenen Zahlen bewiesen werden: sonst wird die nächste Ebene ohnehin generiert
+        for inverse in (False, True):
+            for number in list(pending):
+                res, covered = tables.search(number, inverse)
+                if res is not None:
+                    results[number] = res
+                    pending[number] = res.number_of_digits()
+                    if debug:
+                        print("found", res, "for", number, "with", res.number_of_digits(), "digits, looking if shorter is possible", file=sys.stderr)
+                if pending[number] <= covered + 1:
+                    del pending[number]
+                    yield number, results.pop(number)
+                elif inverse:
+                    break
+        i += 1
+
+
+def find_shortest_range(lo, hi, digit, extended, debug=False, store=None, workers=1, tables=None):
+    """
+    Findet die kürzesten Terme für alle Zahlen von lo bis einschließlich hi mit gemeinsamen Tabellen, siehe find_shortest_batch().
+    Auf jeder Ebene werden alle noch offenen Zahlen gesucht, eine Zahl ist erledigt, sobald ihr Term bewiesen kürzest ist.
+    Falls tables gegeben, werden diese Tabellen benutzt und erweitert. Gibt (Zahl, Term) in der Reihenfolge zurück, in der die Zahlen erledigt sind.
+    """
+    if tables is None:
+        tables = Tables(digit, extended, store=store, debug=debug, workers=workers)
+    return find_shortest_batch(range(lo, hi + 1), tables, debug=debug)
+
+
+def find_shortest_anytime(number, tables, timeout=None, max_level=None, debug=False):
+    """
+    Sucht wie find_shortest() den kürzesten Term für number mit den Tabellen tables, gibt aber jeden kürzeren Term sofort als (Term, bewiesen) zurück.
+    bewiesen ist wahr, wenn es keinen kürzeren Term geben kann, dann endet die Suche.
+    Falls timeout (Sekunden) oder max_level (höchste Ebene) gegeben, endet die Suche spätestens dann. Der zuletzt zurückgegebene Term ist der beste gefundene.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    best = math.inf
+
+    i = max(tables.num_digits, 0)
+    while max_level is None or i <= max_level:
+        try:
+            tables.grow(i, deadline)
+        except SearchTimeout:
             if debug:
-                print("found", res, "with", res.number_of_digits(), "digits, looking if shorter is possible")
+                print("time is up while generating split table with digits:", i, file=sys.stderr)
+            return
+        res, covered = tables.search(number)
+        if res is not None:
+            proven = res.number_of_digits() <= covered + 1
+            if res.number_of_digits() < best or proven:
+                best = res.number_of_digits()
+                if debug:
+                    print("found", res, "with", res.number_of_digits(), "digits", "(proven shortest)" if proven else "", file=sys.stderr)
+                yield res, proven
+            if proven:
+                return
         i += 1
-    return res
+
+
+def find_shortest_within(number, digit, extended, timeout=None, max_level=None, debug=False, store=None, workers=1, tables=None):
+    """
+    Wie find_shortest(), die Suche endet aber spätestens nach timeout Sekunden oder mit der Ebene max_level.
+    Falls tables gegeben, werden diese Tabellen benutzt und erweitert.
+    Gibt (Term, bewiesen) zurück. Term ist None, falls bis dahin kein Term gefunden wurde.
+    """
+    if tables is None:
+        tables = Tables(digit, extended, store=store, debug=debug, workers=workers)
+    res, proven = None, False
+    for res, proven in find_shortest_anytime(number, tables, timeout, max_level, debug=debug):
+        pass
+    return res, proven
+
+
+def find_shortest(number, digit, extended, debug=False, store=None, workers=1):
+    """
+    Findet den kürzesten Term, der die Zahl number nur durch die Ziffer digit repräsentiert.
+    Sucht für jeden Term der Tabelle nach einem Partner, mit dem zusammen durch eine Rechenoperation die gegebene Zahl number erhalten wird.
+    Falls extended, werden auch Fakultäts- und Potenzfunktionen benutzt.
+    Falls store gegeben, werden bereits gespeicherte Ebenen geladen statt generiert und neue Ebenen gespeichert.
+    Falls workers > 1, werden große Ebenen mit so vielen Prozessen generiert.
+    """
+    tables = Tables(digit, extended, store=store, debug=debug, workers=workers)
+    for _, res in find_shortest_batch([number], tables, debug=debug):
+        return res
+
+
+def _solve_digit(task):
+    """
+    Sucht in einem Prozess von find_shortest_all_digits() die kürzesten Terme für eine Ziffer in beiden Modi.
+    Die Ergebnisse werden als result_record() und die Messwerte als SearchStats.as_dict() zurückgegeben, damit nicht die ganzen Tabellen übertragen werden.
+    """
+    number, digit, timeout, max_level, store, value_limit, memory_limit, spill = task
+    normal = Tables(digit, False, store=store, stats=SearchStats(), value_limit=value_limit, memory_limit=memory_limit, spill=spill)
+    extended = Tables(digit, True, store=store, seed=normal, stats=SearchStats(), value_limit=value_limit, memory_limit=memory_limit, spill=spill)
+    row = [digit]
+    for tables in (normal, extended):
+        begin = time.perf_counter()
+        res, proven = find_shortest_within(number, digit, tables.extended, timeout, max_level, tables=tables)
+        row.append(result_record(number, res, proven, tables, time.perf_counter() - begin))
+    row.append({"normal": normal.stats.as_dict(), "extended": extended.stats.as_dict()})
+    return tuple(row)
+
+def find_shortest_all_digits(number, timeout=None, max_level=None, store=None, processes=None, value_limit=None, memory_limit=None, spill=None):
+    """
+    Sucht die kürzesten Terme für number mit jeder Ziffer von 1 bis 9 in beiden Modi, jede Ziffer in einem eigenen Prozess.
+    Höchstens processes Ziffern (Standard: Anzahl der CPUs) werden gleichzeitig gesucht.
+    Gibt (Ziffer, normal, erweitert, Messwerte) zurück, sobald eine Ziffer fertig ist. normal und erweitert sind die Ergebnisse als result_record(),
+    ihr Term ist None, falls innerhalb von timeout und max_level (siehe find_shortest_within()) kein Term gefunden wurde.
+    Messwerte enthält für beide Modi SearchStats.as_dict().
+    value_limit begrenzt die Werte in den Tabellen, siehe generate(). memory_limit und spill gelten für jede Tabelle, siehe Tables.
+    """
+    import multiprocessing
+    tasks = [(number, digit, timeout, max_level, store, value_limit, memory_limit, spill) for digit in range(1, 10)]
+    with multiprocessing.get_context('fork').Pool(processes) as pool:
+        for row in pool.imap_unordered(_solve_digit, tasks):
+            yield row
+
+
+def result_record(number, res, proven, tables, seconds):
+    """
+    Gibt das Ergebnis res der Suche nach number mit den Tabellen tables als Dictionary zurück, das direkt als JSON ausgegeben werden kann.
+    levels ist die höchste generierte Ebene, seconds die Dauer der Suche. Falls die Tabellen SearchStats haben,
+    kommen die Zeiten in generate() und scan() dazu, bei gemeinsamen Tabellen seit deren Erstellung.
+    """
+    record = {
+        "number": number,
+        "digit": tables.digit,
+        "mode": "extended" if tables.extended else "normal",
+        "term": str(res) if res is not None else None,
+        "digits": res.number_of_digits() if res is not None else None,
+        "proven": proven,
+        "levels": tables.num_digits,
+        "value_limit": tables.value_limit,
+        "seconds": seconds,
+    }
+    if tables.stats is not None:
+        record["generate_seconds"] = tables.stats.total('generate_seconds')
+        record["scan_seconds"] = tables.stats.total('scan_seconds')
+    return record
+
+
+def print_record(record):
+    """
+    Gibt record als eine Zeile JSON aus. Die Ausgabe wird sofort geschrieben, damit sie schon während der Suche gelesen werden kann.
+    """
+    print(json.dumps(record), flush=True)
+
+
+def write_stats(file, data):
+    """
+    Schreibt die Messwerte data als JSON in die Datei file, bei '-' auf die Standardausgabe.
+    """
+    if file == '-':
+        json.dump(data, sys.stdout, indent=1)
+        print()
+    else:
+        with open(file, 'w') as f:
+            json.dump(data, f, indent=1)
+
+
+def print_all_digits(number, rows):
+    """
+    Gibt die Ergebnisse von find_shortest_all_digits() als Tabelle aus, jede Zeile sobald ihre Ziffer fertig ist.
+    Nicht bewiesen kürzeste Terme sind mit * markiert.
+    """
+    def cell(record):
+        if record["term"] is None:
+            return "-", "-"
+        return str(record["digits"]) + ("" if record["proven"] else "*"), record["term"]
+
+    print("{:>5} {:>6} {:>8}  {:40} {}".format("digit", "normal", "extended", "normal term", "extended term"), flush=True)
+    best = {}
+    for digit, normal, extended, _ in rows:
+        (normal_digits, normal_term), (extended_digits, extended_term) = cell(normal), cell(extended)
+        print("{:>5} {:>6} {:>8}  {:40} {}".format(digit, normal_digits, extended_digits, normal_term, extended_term), flush=True)
+        for mode, record in (("normal", normal), ("extended", extended)):
+            if record["term"] is not None and (mode not in best or (record["digits"], digit) < best[mode]):
+                best[mode] = (record["digits"], digit)
+    print()
+    for mode in ("normal", "extended"):
+        if mode in best:
+            print("fewest digits for {} ({}): {} with digit {}".format(number, mode, *best[mode]))
+
+
+def window_limit(factor, numbers):
+    """
+    Gibt den höchsten Betrag der Werte zurück, die mit dem Fenster factor für die gesuchten Zahlen numbers in den Tabellen bleiben.
+    Löst ValueError aus, falls factor kleiner als 1 ist.
+    """
+    # Mit factor >= 1 ist jede Zahl als Summe aus (d/d) erreichbar, ohne das Fenster zu verlassen. Sonst endet die Suche nie.
+    if not factor >= 1:
+        raise ValueError("--window must be at least 1")
+    return int(factor * max(max((abs(number) for number in numbers), default=1), 1))
+
+
+def print_window(value_limit):
+    """
+    Weist darauf hin, dass die Ergebnisse nur innerhalb des Wertebereichs kürzest sind.
+    """
+    if value_limit is not None:
+        print()
+        print("note: intermediate values were limited to", value_limit, "(factorials excepted), terms are only shortest within that window")
+
+
+def print_result(mode, res, proven):
+    """
+    Gibt das Ergebnis res der Suche im Modus mode aus.
+    """
+    if res is None:
+        print(mode, "result: none found within the limits")
+        return
+    print(mode, "result", res)
+    if proven:
+        print("digits:", res.number_of_digits())
+    else:
+        print("digits:", res.number_of_digits(), "(search stopped early, a shorter term may exist)")
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Decompose a number into a term using one digit")
     parser.add_argument("number", help="number to decompose", type=int)
-    parser.add_argument("digit", help="digit to decompose into", type=int)
+    parser.add_argument("digit", help="digit to decompose into (default: every digit from 1 to 9, solved in parallel)", type=int, nargs='?')
     parser.add_argument("--verbose", "-v", help="enable verbose output", action='store_true')
+    parser.add_argument("--cache", help="directory in which generated tables are stored and reused", metavar="DIR")
+    parser.add_argument("--workers", "-j", help="number of processes used to generate large tables, or to solve digits at once if no digit is given (default: 1, or number of CPUs)", type=int)
+    parser.add_argument("--timeout", "-t", help="stop searching after this many seconds per mode and print the best term found", type=float)
+    parser.add_argument("--max-level", help="do not generate tables of terms with more digits than this", type=int)
+    parser.add_argument("--stats", help="write per-level timings, candidate counts, table sizes and peak memory as JSON to FILE ('-' for stdout)", metavar="FILE")
+    parser.add_argument("--window", help="only keep intermediate values up to K times the number (factorials excepted); results are then only shortest within that window", type=float, metavar="K")
+    parser.add_argument("--memory", help="keep about MB of terms per table in memory and spill older levels to disk before generating a new level (tables are then not cached)", type=float, metavar="MB")
+    parser.add_argument("--spill", help="directory for spilled levels, created if missing (default: the system's temporary directory)", metavar="DIR")
+    parser.add_argument("--json", help="print one JSON object per line for every digit and mode as soon as it is solved, instead of text", action='store_true')
     args = parser.parse_args()
 
+    if args.json and args.stats == "-":
+        # Die Standardausgabe enthält dann nur Zeilen mit je einem JSON-Objekt
+        print("Error: --json cannot be combined with --stats -, write the stats to a file", file=sys.stderr)
+        exit(1)
+
+    if args.workers is not None and args.workers < 1:
+        print("Error: --workers must be at least 1", file=sys.stderr)
+        exit(1)
+
+    if args.spill is not None:
+        try:
+            os.makedirs(args.spill, exist_ok=True)
+        except OSError as e:
+            print("Error: cannot use spill directory:", e, file=sys.stderr)
+            exit(1)
+
+    store = TableStore(args.cache) if args.cache is not None else None
+    try:
+        value_limit = window_limit(args.window, [args.number]) if args.window is not None else None
+    except ValueError as e:
+        print("Error:", e, file=sys.stderr)
+        exit(1)
+    memory_limit = int(args.memory * 2 ** 20) if args.memory is not None else None
+
+    if args.digit is None:
+        # Ziffer -> Modus -> SearchStats.as_dict()
+        stats = {}
+        def collect(rows):
+            for row in rows:
+                stats[row[0]] = row[3]
+                yield row
+        rows = collect(find_shortest_all_digits(args.number, args.timeout, args.max_level, store, args.workers, value_limit, memory_limit, args.spill))
+        if args.json:
+            for _, normal, extended, _ in rows:
+                print_record(normal)
+                print_record(extended)
+        else:
+            print_all_digits(args.number, rows)
+            print_window(value_limit)
+        if args.stats is not None:
+            write_stats(args.stats, {"number": args.number, "value_limit": value_limit, "digits": dict(sorted(stats.items()))})
+        exit(0)
+
     if len(str(args.digit)) != 1 or args.digit == 0:
         print("Error:", args.digit, "is not a digit, exiting...", file=sys.stderr)
         exit(1)
+    workers = args.workers if args.workers is not None else 1
 
-    if args.verbose:
+    if args.verbose and not args.json:
         print("looking for normal shortest")
-    res_normal = find_shortest(args.number, args.digit, False, args.verbose)
+    # Die erweiterte Suche benutzt die Tabellen der normalen Suche weiter
+    stats = {"normal": SearchStats(), "extended": SearchStats()} if args.stats is not None or args.json else {}
+    normal = Tables(args.digit, False, store=store, debug=args.verbose, workers=workers, stats=stats.get("normal"), value_limit=value_limit,
+                    memory_limit=memory_limit, spill=args.spill)
+    extended = Tables(args.digit, True, store=store, debug=args.verbose, workers=workers, seed=normal, stats=stats.get("extended"), value_limit=value_limit,
+                      memory_limit=memory_limit, spill=args.spill)
+    begin = time.perf_counter()
+    res_normal, proven_normal = find_shortest_within(args.number, args.digit, False, args.timeout, args.max_level, args.verbose, tables=normal)
+    if args.json:
+        print_record(result_record(args.number, res_normal, proven_normal, normal, time.perf_counter() - begin))
 
-    if args.verbose:
+    if args.verbose and not args.json:
         print()
         print("looking for extended shortest")
-    res_extended = find_shortest(args.number, args.digit, True, args.verbose)
-
-    if args.verbose:
+    begin = time.perf_counter()
+    res_extended, proven_extended = find_shortest_within(args.number, args.digit, True, args.timeout, args.max_level, args.verbose, tables=extended)
+    if args.json:
+        print_record(result_record(args.number, res_extended, proven_extended, extended, time.perf_counter() - begin))
+    else:
+        if args.verbose:
+            print()
+        print_result("normal", res_normal, proven_normal)
         print()
-    print("normal result", res_normal)
-    print("digits:", res_normal.number_of_digits())
-
-    print()
-    print("extended result", res_extended)
-    print("digits:", res_extended.number_of_digits())
+        print_result("extended", res_extended, proven_extended)
+        print_window(value_limit)
 
+    if args.stats is not None:
+        write_stats(args.stats, {"number": args.number, "digit": args.digit, "value_limit": value_limit,
+                                 "modes": {mode: stats[mode].as_dict() for mode in stats}})
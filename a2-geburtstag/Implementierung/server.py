@@ -0,0 +1,160 @@
+import sys
+import json
+import argparse
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from main import Tables, TableStore, TERM_BYTES, find_shortest_within
+
+
+class DigitTables(object):
+    """
+    Die normalen und die darauf aufbauenden erweiterten Tabellen einer Ziffer.
+    Die Tabellen sind nicht threadsicher, alle Zugriffe laufen daher über lock.
+    """
+
+    def __init__(self, digit, store=None, workers=1):
+        self.digit = digit
+        self.lock = threading.Lock()
+        self.normal = Tables(digit, False, store=store, workers=workers)
+        self.extended = Tables(digit, True, store=store, workers=workers, seed=self.normal)
+
+    def memory(self):
+        """
+        Gibt den geschätzten Speicherbedarf in Bytes zurück.
+        """
+        return (len(self.normal.arena) + len(self.extended.arena)) * TERM_BYTES
+
+
+class Solver(object):
+    """
+    Hält die Tabellen aller bereits angefragten Ziffern im Speicher und beantwortet Anfragen mehrerer Threads gleichzeitig.
+    Anfragen für verschiedene Ziffern laufen parallel, Anfragen für die gleiche Ziffer nacheinander.
+    Übersteigt der geschätzte Speicherbedarf memory_limit (Bytes), werden die am längsten nicht benutzten Ziffern verworfen.
+    """
+
+    def __init__(self, memory_limit=None, store=None, workers=1):
+        self.memory_limit = memory_limit
+        self.store = store
+        self.workers = workers
+        self.lock = threading.Lock()
+        # Ziffer -> DigitTables, die zuletzt benutzte Ziffer steht am Ende
+        self.tables = OrderedDict()
+
+    def get(self, digit):
+        with self.lock:
+            if digit not in self.tables:
+                self.tables[digit] = DigitTables(digit, self.store, self.workers)
+            self.tables.move_to_end(digit)
+            return self.tables[digit]
+
+    def evict(self):
+        """
+        Verwirft die am längsten nicht benutzten Tabellen, bis der Speicherbedarf unter dem Limit liegt.
+        Tabellen, die gerade benutzt werden, werden übersprungen.
+        """
+        if self.memory_limit is None:
+            return
+        with self.lock:
+            for digit in list(self.tables):
+                if sum(tables.memory() for tables in self.tables.values()) <= self.memory_limit:
+                    break
+                tables = self.tables[digit]
+                if tables.lock.acquire(blocking=False):
+                    try:
+                        del self.tables[digit]
+                    finally:
+                        tables.lock.release()
+
+    def solve(self, number, digit, modes, timeout=None, max_level=None):
+        """
+        Sucht die kürzesten Terme für number in den gegebenen Modi ('normal', 'extended').
+        Gibt ein Dictionary Modus -> (Term, bewiesen) zurück, siehe find_shortest_within().
+        """
+        tables = self.get(digit)
+        results = {}
+        with tables.lock:
+            for mode in modes:
+                results[mode] = find_shortest_within(number, digit, mode == "extended", timeout, max_level,
+                                                     tables=getattr(tables, mode))
+        self.evict()
+        return results
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    Beantwortet GET /shortest?number=2019&digit=3[&mode=normal|extended][&timeout=Sekunden][&max_level=Ebene] mit JSON.
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/shortest":
+            self.reply(404, {"error": "unknown path " + url.path})
+            return
+        query = parse_qs(url.query)
+        try:
+            number = int(query["number"][0])
+            digit = int(query["digit"][0])
+            modes = query.get("mode", ["normal", "extended"])
+            timeout = float(query["timeout"][0]) if "timeout" in query else None
+            max_level = int(query["max_level"][0]) if "max_level" in query else None
+        except (KeyError, ValueError) as e:
+            self.reply(400, {"error": "invalid query: {}".format(e)})
+            return
+        if not 1 <= digit <= 9:
+            self.reply(400, {"error": "{} is not a digit".format(digit)})
+            return
+        if any(mode not in ("normal", "extended") for mode in modes):
+            self.reply(400, {"error": "mode must be normal or extended"})
+            return
+
+        results = self.server.solver.solve(number, digit, modes, timeout, max_level)
+        response = {"number": number, "digit": digit}
+        for mode, (res, proven) in results.items():
+            if res is None:
+                response[mode] = None
+            else:
+                response[mode] = {"term": str(res), "digits": res.number_of_digits(), "proven": proven}
+        self.reply(200, response)
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Answer decomposition queries over HTTP, keeping the tables of every digit in memory")
+    parser.add_argument("--host", help="address to listen on (default: localhost)", default="127.0.0.1")
+    parser.add_argument("--port", "-p", help="port to listen on", type=int, default=8019)
+    parser.add_argument("--memory", "-m", help="approximate memory limit for all tables in MB, least recently used digits are dropped first", type=float)
+    parser.add_argument("--verbose", "-v", help="log every request", action='store_true')
+    parser.add_argument("--cache", help="directory in which generated tables are stored and reused", metavar="DIR")
+    parser.add_argument("--workers", "-j", help="number of processes used to generate large tables", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        print("Error: --workers must be at least 1", file=sys.stderr)
+        exit(1)
+
+    store = TableStore(args.cache) if args.cache is not None else None
+    memory_limit = int(args.memory * 2 ** 20) if args.memory is not None else None
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.solver = Solver(memory_limit, store, args.workers)
+    server.verbose = args.verbose
+    print("listening on http://{}:{}/shortest".format(*server.server_address), file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
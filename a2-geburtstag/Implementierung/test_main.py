@@ -0,0 +1,71 @@
+"""
+Tests der exakten Ganzzahl-Rechnung an der Grenze von MAX_DIGITS Ziffern.
+
+    python -m pytest test_main.py
+"""
+import math
+
+from main import MAX_DIGITS, BinaryOperation, iroot, perfect_powers, power_fits, combine, find_shortest
+
+# Größte Zahl mit MAX_DIGITS Ziffern
+LARGEST = 10 ** MAX_DIGITS - 1
+
+
+def test_iroot_100_digits():
+    for k in (2, 3, 5, 7, 33, 100, 332):
+        r = iroot(LARGEST, k)
+        assert r ** k <= LARGEST < (r + 1) ** k
+    # Genau an einer Potenz und eins darunter
+    n = 7 ** 118
+    assert len(str(n)) == MAX_DIGITS
+    assert iroot(n, 118) == 7
+    assert iroot(n - 1, 118) == 6
+    assert iroot(n, 2) == math.isqrt(n)
+
+
+def test_perfect_powers_100_digits():
+    n = 3 ** 209
+    assert len(str(n)) == MAX_DIGITS
+    assert perfect_powers(n) == [(3 ** 19, 11), (3 ** 11, 19), (3, 209)]
+    assert perfect_powers(n + 1) == []
+    assert perfect_powers(LARGEST) == []
+
+
+def test_power_fits_boundary():
+    assert len(str(3 ** 209)) == MAX_DIGITS
+    assert power_fits(3, 209)
+    assert not power_fits(3, 210)
+    assert power_fits(10, MAX_DIGITS - 1)
+    assert not power_fits(10, MAX_DIGITS)
+    assert power_fits(2, 332)
+    assert not power_fits(2, 333)
+    assert not power_fits(LARGEST, 2)
+
+
+def test_combine_exact_division():
+    # Quotienten über 2^53 lassen sich nicht exakt als float darstellen
+    quotient = 2 ** 60 + 1
+    found, _ = combine([(quotient * 3, 0)], [(3, 1)], {}, False)
+    assert (quotient, BinaryOperation.OP_DIV, 0, 1) in found
+
+    divisor = 3 ** 40
+    found, _ = combine([(divisor * 7, 0)], [(divisor, 1)], {}, False)
+    assert (7, BinaryOperation.OP_DIV, 0, 1) in found
+
+    # Nicht teilbar, obwohl der Quotient als float ganzzahlig aussieht
+    found, _ = combine([(10 ** 20 + 1, 0)], [(3, 1)], {}, False)
+    assert not any(op == BinaryOperation.OP_DIV for _, op, _, _ in found)
+
+
+def test_find_power_tower():
+    number = 3 ** (3 ** 3)
+    res = find_shortest(number, 3, True)
+    assert res.value() == number
+    assert res.number_of_digits() == 3
+
+
+def test_find_factorial_product():
+    number = math.factorial(33) * 3
+    res = find_shortest(number, 3, True)
+    assert res.value() == number
+    assert res.number_of_digits() == 3
@@ -1,119 +1,279 @@
+import os
 import sys
 import math
-import queue
+import mmap
+import heapq
+import struct
+import hashlib
 import numpy as np
-import collections
-import itertools
+from array import array
 from collections import defaultdict
 
-# Auf wie viele Ziffern wird der Quotient gerundet, wenn ermittelt wird, ob an einer Kreuzung abgebogen werden muss?
-FLOAT_ERROR_DIGITS = 8
+# Bis zu diesem Betrag der Koordinaten passen Kreuz- und Skalarprodukte in int64, darüber wird mit Python-ints gerechnet
+INT64_COORDINATE_LIMIT = 2 ** 30
 
-def straight(p1, junc, p2):
-    """
-    Kann man von Kreuzung Punkt p1 über Kreuzung junc auf Punkt p2 gehen, ohne abbiegen zu müssen?
-    """
-    delta1_x = junc[0] - p1[0]
-    delta1_y = junc[1] - p1[1]
-    delta_1 = distance(p1, junc)
-
-    delta2_x = p2[0] - junc[0]
-    delta2_y = p2[1] - junc[1]
-    delta_2 = distance(p2, junc)
+# Version des Formats der Cache-Dateien, muss bei jeder Änderung von build_graph() oder RoadGraph erhöht werden
+CACHE_VERSION = 1
 
-    return abs(round((delta1_x*delta2_x+delta1_y*delta2_y)/(delta_1*delta_2), FLOAT_ERROR_DIGITS))==1
-
-def distance(p1, p2):
+def straight(delta1, delta2):
     """
-    Berechnet die Distanz von Punkt p1 zu Punkt p2
+    Kann man in Richtung delta1 an einer Kreuzung ankommen und in Richtung delta2 weiterfahren, ohne abbiegen zu müssen?
+    Bearbeitet alle Paare von ganzzahligen Richtungen in den Arrays delta1 und delta2 (n x 2) auf einmal und rechnet exakt:
+    Die Richtungen müssen parallel sein (Kreuzprodukt 0) und in dieselbe Richtung zeigen (Skalarprodukt positiv).
     """
-    return math.sqrt((p1[0]-p2[0])**2+(p1[1]-p2[1])**2)
+    cross = delta1[:, 0] * delta2[:, 1] - delta1[:, 1] * delta2[:, 0]
+    dot = delta1[:, 0] * delta2[:, 0] + delta1[:, 1] * delta2[:, 1]
+    return (cross == 0) & (dot > 0)
 
-def format_roadnode(j1, j2):
+class RoadGraph(object):
     """
-    Knoten eines edge-based-graphs (Straße), der im node-based-graph eine Kante zwischen zwei Knoten war, als str repräsentieren
+    Edge-based-graph im CSR-Format. Seine Knoten sind die Straßen, nummeriert von 0 bis roads - 1: die Straße r verbindet
+    die Kreuzungen ends[r] und ist lengths[r] lang. Die Nachbarn der Straße r stehen in neighbors[offsets[r]:offsets[r + 1]],
+    turns gibt für jeden Eintrag von neighbors an, ob beim Wechsel auf diese Straße abgebogen werden muss (1) oder nicht (0).
+    positions sind die Koordinaten der Kreuzungen. sources sind die Straßen am Start, targets die Straßen am Ziel, siehe set_endpoints().
     """
-    if j1 < j2:
-        return '{}_{}'.format(j1, j2)
-    return '{}_{}'.format(j2, j1)
 
-def get_roadnode(n):
+    def __init__(self, positions, ends, lengths, offsets, neighbors, turns):
+        self.positions = positions
+        self.ends = ends
+        self.lengths = lengths
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.turns = turns
+        self.sources = None
+        self.targets = None
+
+    @property
+    def roads(self):
+        return len(self.lengths)
+
+    def get_roadnode(self, n):
+        """
+        Die Knoten des node-based-graphs ermitteln, zwischen denen der Knoten n des edge-based-graphs liegt
+        """
+        return tuple(self.ends[n].tolist())
+
+    def find_junction(self, coords):
+        """
+        Gibt die Nummer der Kreuzung mit den Koordinaten coords zurück, KeyError falls es sie nicht gibt
+        """
+        found = np.flatnonzero((self.positions == np.array(coords, dtype=self.positions.dtype)).all(axis=1))
+        if len(found) == 0:
+            raise KeyError(coords)
+        return int(found[0])
+
+    def set_endpoints(self, source_junction, target_junction):
+        """
+        Die Straßen an der Kreuzung source_junction als Start und die an target_junction als Ziel festlegen
+        """
+        self.sources = np.flatnonzero((self.ends == source_junction).any(axis=1)).astype(np.int32)
+        self.targets = np.flatnonzero((self.ends == target_junction).any(axis=1)).astype(np.int32)
+
+def build_graph(junctions, roads, source_junction=None, target_junction=None):
     """
-    Die Knoten des node-based-graphs ermitteln, zwischen denen der Knoten n des edge-based-graphs liegt
+    Den node-based-graph aus den Kreuzungen junctions, den Straßen roads, dem Start source_junction und dem Ziel target_junction in einen edge-based-graph umwandeln.
+    Start und Ziel können auch später mit RoadGraph.set_endpoints() festgelegt werden, der Graph hängt sonst nicht von ihnen ab.
     """
-    return tuple(map(int, n.split("_")))
-
-def build_graph(junctions, roads, source_junction, target_junction):
+    # Die Straßen werden in der Reihenfolge der Texte 'a_b' nummeriert, mit denen sie früher benannt waren:
+    # pareto_search() löst Gleichstände über die Nummern auf und wählt damit unter gleich guten Wegen wie bisher
+    ends = sorted({(source, target) if source < target else (target, source) for source in roads for target in roads[source]},
+                  key=lambda road: '{}_{}'.format(*road))
+    ends = np.array(ends, dtype=np.int64).reshape(-1, 2)
+    road_count = len(ends)
+
+    # Koordinaten nach Nummer der Kreuzung
+    large = any(abs(c) >= INT64_COORDINATE_LIMIT for position in junctions.values() for c in position)
+    positions = np.zeros((max(junctions, default=-1) + 1, 2), dtype=object if large else np.int64)
+    for junction, position in junctions.items():
+        positions[junction] = position
+
+    delta = positions[ends[:, 1]] - positions[ends[:, 0]]
+    lengths = np.sqrt((delta[:, 0] * delta[:, 0] + delta[:, 1] * delta[:, 1]).astype(np.float64))
+
+    # Jede Straße an jeder ihrer beiden Kreuzungen, nach Kreuzung sortiert: (Kreuzung, Straße, Kreuzung am anderen Ende)
+    at_junction = np.concatenate((ends[:, 0], ends[:, 1]))
+    at_road = np.concatenate((np.arange(road_count), np.arange(road_count)))
+    at_other = np.concatenate((ends[:, 1], ends[:, 0]))
+    order = np.argsort(at_junction, kind='stable')
+    at_junction, at_road, at_other = at_junction[order], at_road[order], at_other[order]
+
+    # Alle Paare (first, second) mit first < second von Straßen an derselben Kreuzung
+    group_end = np.searchsorted(at_junction, at_junction, side='right')
+    counts = group_end - np.arange(len(at_junction)) - 1
+    first = np.repeat(np.arange(len(at_junction)), counts)
+    second = first + 1 + np.arange(len(first)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    junction_positions = positions[at_junction[first]]
+    turn = ~straight(junction_positions - positions[at_other[first]], positions[at_other[second]] - junction_positions)
+
+    # Kanten als Paare von Straßen, in beide Richtungen
+    edge_from = np.concatenate((at_road[first], at_road[second]))
+    edge_to = np.concatenate((at_road[second], at_road[first]))
+    edge_turns = np.concatenate((turn, turn))
+
+    # Nach Ausgangsstraße sortieren, die Anzahl der Kanten je Straße ergibt die Offsets
+    order = np.argsort(edge_from, kind='stable')
+    offsets = np.zeros(road_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(edge_from, minlength=road_count), out=offsets[1:])
+    neighbors = edge_to[order].astype(np.int32)
+    turns = edge_turns[order].astype(np.uint8)
+
+    graph = RoadGraph(positions, ends.astype(np.int32), lengths, offsets, neighbors, turns)
+    if source_junction is not None:
+        graph.set_endpoints(source_junction, target_junction)
+    return graph
+
+class GraphStore(object):
     """
-    Den node-based-graph aus den Kreuzungen junctions, den Straßen roads, dem Start source_junction und dem Ziel target_junction in einen edge-based-graph umwandeln
+    Speichert vorverarbeitete edge-based-graphs auf der Festplatte, da sie nur vom Straßennetz abhängen, nicht von Start und Ziel.
+    Jeder Graph liegt in einer eigenen Datei, die über (Version, network_key() der Eingabedatei) gefunden wird.
+    Eine Datei enthält die Arrays des RoadGraph, sie werden beim Laden nur in den Speicher abgebildet und nicht kopiert.
     """
-    nodes = dict()
-    edges = collections.defaultdict(set)
-
-    for source in roads:
-        for target in roads[source]:
-            nodes[format_roadnode(source, target)] = distance(junctions[source], junctions[target])
-    
-    for junction in junctions:
-        for comb in itertools.combinations(roads[junction], 2):
-            pos0 = junctions[comb[0]]
-            posj = junctions[junction]
-            pos1 = junctions[comb[1]]
-            s = straight(pos0, posj, pos1)
-            r0 = format_roadnode(comb[0], junction)
-            r1 = format_roadnode(comb[1], junction)
-            edges[r0].add((r1, s))
-            edges[r1].add((r0, s))
-    
-
-    sources = set()
-    for next_junction in roads[source_junction]:
-        sources.add(format_roadnode(source_junction, next_junction))
-    
-    targets = set()
-    for last_junction in roads[target_junction]:
-        targets.add(format_roadnode(target_junction, last_junction))
-
 
-    return nodes, edges, sources, targets
-
-def dijkstra(nodes, edges, sources, targets, number_turns=None):
+    MAGIC = b'ABGRAPH'
+    # Magic, Version, Anzahl Kreuzungen, Anzahl Straßen, Anzahl Kanten, aufgefüllt auf 8 Bytes
+    HEADER = struct.Struct('=7sHQQQ7x')
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, key):
+        return os.path.join(self.directory, 'v{}'.format(CACHE_VERSION), '{}.bin'.format(key))
+
+    @staticmethod
+    def columns(junction_count, road_count, edge_count):
+        """
+        Gibt (Name, Typ, Form) der Arrays in der Reihenfolge der Datei zurück. Die Arrays mit größeren Elementen stehen vorne,
+        so beginnt jedes an einer durch seine Elementgröße teilbaren Position.
+        """
+        return (('positions', np.int64, (junction_count, 2)), ('lengths', np.float64, (road_count,)), ('offsets', np.int64, (road_count + 1,)),
+                ('ends', np.int32, (road_count, 2)), ('neighbors', np.int32, (edge_count,)), ('turns', np.uint8, (edge_count,)))
+
+    def load(self, key):
+        """
+        Lädt den Graphen mit dem Schlüssel key. Gibt None zurück, falls er nicht gespeichert ist.
+        """
+        try:
+            with open(self.path(key), 'rb') as f:
+                m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        arrays = {}
+        try:
+            magic, version, junction_count, road_count, edge_count = GraphStore.HEADER.unpack_from(m, 0)
+            if (magic, version) == (GraphStore.MAGIC, CACHE_VERSION):
+                offset = GraphStore.HEADER.size
+                for name, dtype, shape in GraphStore.columns(junction_count, road_count, edge_count):
+                    count = int(np.prod(shape))
+                    arrays[name] = np.frombuffer(m, dtype=dtype, count=count, offset=offset).reshape(shape)
+                    offset += count * np.dtype(dtype).itemsize
+                # Die Arrays verweisen auf m, die Abbildung bleibt so lange bestehen wie der Graph
+                return RoadGraph(**arrays)
+        except (ValueError, struct.error):
+            pass
+        # Erst schließen, wenn kein Array mehr auf m verweist
+        arrays.clear()
+        m.close()
+        return None
+
+    def save(self, key, graph):
+        """
+        Speichert den Graphen graph unter dem Schlüssel key. Netze mit Koordinaten außerhalb von int64 werden nicht gespeichert.
+        """
+        if graph.positions.dtype == object:
+            return
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Erst vollständig schreiben, dann umbenennen, damit parallele Läufe nie eine halbe Datei lesen
+        tmp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp, 'wb') as f:
+            f.write(GraphStore.HEADER.pack(GraphStore.MAGIC, CACHE_VERSION, len(graph.positions), graph.roads, len(graph.neighbors)))
+            for name, dtype, _ in GraphStore.columns(len(graph.positions), graph.roads, len(graph.neighbors)):
+                f.write(np.ascontiguousarray(getattr(graph, name), dtype=dtype).tobytes())
+        os.replace(tmp, path)
+
+def pareto_search(graph, tolerance=None):
     """
-    Den Dijkstra-Shortest-Path-Algorithmus mit der maximalen Anzahl an Abbiegevorgängen number_turns auf dem gegebenen edge-based-graph ausführen (siehe Dokumentation)
+    Sucht in einem Durchlauf alle Pareto-optimalen Wege (Länge, Anzahl Abbiegevorgänge) von den Straßen am Start zu den Straßen am Ziel
+    im gegebenen edge-based-graph (multikriterielle Label-Setting-Suche, siehe Dokumentation).
+    Die Labels werden nach (Länge, Abbiegevorgänge) geordnet fertiggestellt. Ein Label ist dominiert und wird verworfen, wenn ein fertiges Label
+    derselben Straße oder ein fertiger Weg zum Ziel höchstens so viele Abbiegevorgänge hat, da es nicht kürzer sein kann.
+    Falls tolerance (Prozent) gegeben, endet die Suche bei Wegen, die um mehr als tolerance Prozent länger als der kürzeste Weg sind.
+    Gibt die Pareto-Front als Liste von (Weg als Liste der Knoten des edge-based-graphs, Länge, Anzahl Abbiegevorgänge) zurück,
+    nach steigender Länge und damit fallender Anzahl Abbiegevorgänge geordnet.
     """
-    pq = queue.PriorityQueue()
-    for source in sources:
-        pq.put((0, source, [source], 0))
-
-    discovered = {}
-    
-    while True:
-        if pq.empty():
-           return None, None, None
-        prio, node, prev, turns = pq.get()
-        if node in discovered and turns >= discovered[node]:
-            continue
-
-        discovered[node] = turns
-        for edge in edges[node]:
-            prio_new = prio + nodes[edge[0]]
-            if not edge[1]:
-                if turns == number_turns:
-                    continue
-
-            pq.put((prio_new, edge[0], prev + [edge[0]], turns + (1 if not edge[1] else 0)))
-
-        if node in targets:
+    # Als Listen ist der Zugriff auf einzelne Elemente deutlich schneller als auf NumPy-Arrays
+    lengths = graph.lengths.tolist()
+    offsets = graph.offsets.tolist()
+    neighbors = graph.neighbors.tolist()
+    turning = graph.turns.tolist()
+    is_target = [False] * graph.roads
+    for target in graph.targets.tolist():
+        is_target[target] = True
+
+    # Einträge (Länge, Abbiegevorgänge, Straße, fertiges Label davor oder -1)
+    heap = [(lengths[source], 0, source, -1) for source in graph.sources.tolist()]
+    heapq.heapify(heap)
+
+    # Fertige Labels: Straße und Vorgänger-Label, die Wege werden erst am Ende daraus zusammengesetzt.
+    # Es gibt oft Millionen davon, als array braucht ein Label 8 Bytes
+    label_nodes = array('i')
+    label_parents = array('i')
+    # Straße -> Abbiegevorgänge ihres letzten fertigen Labels, jedes weitere fertige Label der Straße ist länger und braucht weniger
+    settled = [math.inf] * graph.roads
+    # Abbiegevorgänge des letzten Wegs zum Ziel, ebenso
+    best_turns = math.inf
+    max_distance = math.inf
+
+    # (Label, Länge, Abbiegevorgänge) der Wege zum Ziel
+    found = []
+    while heap:
+        distance, turns, node, parent = heapq.heappop(heap)
+        if distance > max_distance:
             break
+        if turns >= settled[node] or turns >= best_turns:
+            continue
+        settled[node] = turns
+        label = len(label_nodes)
+        label_nodes.append(node)
+        label_parents.append(parent)
+
+        if is_target[node]:
+            if not found and tolerance is not None:
+                max_distance = distance * (1 + tolerance/100)
+            found.append((label, distance, turns))
+            best_turns = turns
+            # Jede Fortsetzung hätte mindestens so viele Abbiegevorgänge und wäre damit dominiert
+            continue
 
-    distance = 0
-    for step in prev:
-        distance += nodes[step]
-    
-    if number_turns is not None and turns != number_turns:
+        for k in range(offsets[node], offsets[node + 1]):
+            neighbor = neighbors[k]
+            neighbor_turns = turns + turning[k]
+            if neighbor_turns < settled[neighbor] and neighbor_turns < best_turns:
+                heapq.heappush(heap, (distance + lengths[neighbor], neighbor_turns, neighbor, label))
+
+    front = []
+    for label, distance, turns in found:
+        path = []
+        while label != -1:
+            path.append(label_nodes[label])
+            label = label_parents[label]
+        front.append((path[::-1], distance, turns))
+    return front
+
+def find_route(junctions, roads, source, target, tolerance, graph=None):
+    """
+    Den Weg von source nach target mit den wenigsten Abbiegevorgängen finden, der höchstens tolerance Prozent länger als der kürzeste Weg ist.
+    Falls graph gegeben, wird dieser edge-based-graph aus build_graph() benutzt.
+    Gibt (Weg als Liste der Knoten des edge-based-graphs, Länge, Anzahl Abbiegevorgänge) zurück, (None, None, None) falls es keinen Weg gibt.
+    """
+    if graph is None:
+        graph = build_graph(junctions, roads, source, target)
+    # Der letzte Weg der Front innerhalb der Toleranz hat die wenigsten Abbiegevorgänge
+    front = pareto_search(graph, tolerance)
+    if not front:
         return None, None, None
-
-    return prev, distance, turns
+    return front[-1]
 
 def parse_tuple(t):
     """
@@ -121,64 +281,81 @@ def parse_tuple(t):
     """
     return tuple(map(int, t.replace('(', '').replace(')', '').split(",")))
 
+def read_input(file):
+    """
+    Die Zeilen der Eingabedatei einlesen
+    """
+    with open(file) as f:
+        return f.read().split("\n")
+
+def network_key(lines):
+    """
+    Schlüssel des Straßennetzes aus den Zeilen lines einer Eingabedatei für GraphStore: SHA-256 aller Zeilen außer Start und Ziel.
+    Eingabedateien, die sich nur in Start und Ziel unterscheiden, benutzen also denselben gespeicherten Graphen.
+    """
+    return hashlib.sha256("\n".join(lines[:1] + lines[3:]).encode()).hexdigest()
+
 def parse_input(file):
     """
     Die Eingabedatei einlesen und in einen node-based-graph umwandeln
     """
-    with open(file) as f:
-        lines = f.read().split("\n")
-        start_coords = parse_tuple(lines[1])
-        end_coords = parse_tuple(lines[2])
-        lines_roads = lines[3:]
-
-        junctions = {}
-        roads = defaultdict(set)
-        junction_to_id = {}
-        i = 0
-        for line_road in lines_roads:
-            if line_road != "":
-                line_road_split = line_road.split(" ")
-                a = parse_tuple(line_road_split[0])
-                b = parse_tuple(line_road_split[1])
-                if a not in junction_to_id:
-                    junction_to_id[a] = i
-                    junctions[i] = a
-                    i += 1
-                if b not in junction_to_id:
-                    junction_to_id[b] = i
-                    junctions[i] = b
-                    i += 1
-                id_a = junction_to_id[a]
-                id_b = junction_to_id[b]
-                roads[id_a].add(id_b)
-                roads[id_b].add(id_a)
-        start = junction_to_id[start_coords]
-        end = junction_to_id[end_coords]
+    return parse_lines(read_input(file))
+
+def parse_lines(lines):
+    """
+    Die Zeilen lines einer Eingabedatei in einen node-based-graph umwandeln
+    """
+    start_coords = parse_tuple(lines[1])
+    end_coords = parse_tuple(lines[2])
+    lines_roads = lines[3:]
+
+    junctions = {}
+    roads = defaultdict(set)
+    junction_to_id = {}
+    i = 0
+    for line_road in lines_roads:
+        if line_road != "":
+            line_road_split = line_road.split(" ")
+            a = parse_tuple(line_road_split[0])
+            b = parse_tuple(line_road_split[1])
+            if a not in junction_to_id:
+                junction_to_id[a] = i
+                junctions[i] = a
+                i += 1
+            if b not in junction_to_id:
+                junction_to_id[b] = i
+                junctions[i] = b
+                i += 1
+            id_a = junction_to_id[a]
+            id_b = junction_to_id[b]
+            roads[id_a].add(id_b)
+            roads[id_b].add(id_a)
+    start = junction_to_id[start_coords]
+    end = junction_to_id[end_coords]
     return junctions, roads, start, end
 
-def visualize(junctions, roads, start, end):
+def visualize(graph, start, end):
     """
-    Die Datei _visualize.tex erstellen, deren Ausgabe das Netzwerk grafisch darstellt
+    Die Datei _visualize.tex erstellen, deren Ausgabe das Netzwerk des edge-based-graphs graph grafisch darstellt
     """
     with open("_visualize.tex", 'w') as f:
         print("\\documentclass{standalone}\n\\usepackage{tikz}\n\\begin{document}\n\\begin{tikzpicture}", file=f)
         print("[auto=left,every node/.style={circle,fill=blue!20}]", file=f)
-        for i in junctions:
+        for i, position in enumerate(graph.positions.tolist()):
             if i == start:
-                print("\\node [style={fill=green!60}]", "(" + str(i) + ")", "at", junctions[i], "{" + str(i) + "};", file=f)
+                print("\\node [style={fill=green!60}]", "(" + str(i) + ")", "at", tuple(position), "{" + str(i) + "};", file=f)
             elif i == end:
-                print("\\node [style={fill=red!60}]", "(" + str(i) + ")", "at", junctions[i], "{" + str(i) + "};", file=f)
+                print("\\node [style={fill=red!60}]", "(" + str(i) + ")", "at", tuple(position), "{" + str(i) + "};", file=f)
             else:
-                print("\\node", "(" + str(i) + ")", "at", junctions[i], "{" + str(i) + "};", file=f)
-        for i in roads:
-            for j in roads[i]:
-                print("\\draw", "(" + str(i) + ")", "--", "(" + str(j) + ");", file=f)
+                print("\\node", "(" + str(i) + ")", "at", tuple(position), "{" + str(i) + "};", file=f)
+        for i, j in graph.ends.tolist():
+            print("\\draw", "(" + str(i) + ")", "--", "(" + str(j) + ");", file=f)
         print("\\end{tikzpicture}\n\\end{document}", file=f)
                 
 if __name__ == '__main__':
 
     if len(sys.argv) < 3:
-        print("Usage", sys.argv[0], "<filename> <tolerance (percent)>", file=sys.stderr)
+        print("Usage", sys.argv[0], "<filename> <tolerance (percent)> [<cache directory>]", file=sys.stderr)
         exit(1)
     
     try:
@@ -186,31 +363,32 @@ if __name__ == '__main__':
         if tolerance < 0:
             raise ValueError
     except ValueError:
-        print("Usage", sys.argv[0], "<filename> <tolerance (percent)>", file=sys.stderr)
+        print("Usage", sys.argv[0], "<filename> <tolerance (percent)> [<cache directory>]", file=sys.stderr)
         exit(1)
 
-
-    junctions, roads, source, target = parse_input(sys.argv[1])
-    visualize(junctions, roads, source, target)
-    nodes, edges, sources, targets = build_graph(junctions, roads, source, target)
-    min_path, min_distance, max_turns = dijkstra(nodes, edges, sources, targets)
-    if min_path is None:
+    lines = read_input(sys.argv[1])
+    # Mit einem Cache-Verzeichnis wird der Graph eines bereits bekannten Netzes geladen statt neu aufgebaut
+    store = GraphStore(sys.argv[3]) if len(sys.argv) > 3 else None
+    graph = store.load(network_key(lines)) if store is not None else None
+    if graph is not None:
+        source = graph.find_junction(parse_tuple(lines[1]))
+        target = graph.find_junction(parse_tuple(lines[2]))
+    else:
+        junctions, roads, source, target = parse_lines(lines)
+        graph = build_graph(junctions, roads)
+        if store is not None:
+            store.save(network_key(lines), graph)
+    graph.set_endpoints(source, target)
+
+    visualize(graph, source, target)
+    res_path, res_distance, res_turns = find_route(None, None, source, target, tolerance, graph)
+    if res_path is None:
         print("Error: Cannot find any path from source to target in road network!")
         exit(1)
 
-    less_turns = 0
-    while True:
-        path, distance, turns = dijkstra(nodes, edges, sources, targets, number_turns=max_turns-less_turns)
-
-        if path is None or distance > min_distance * (1 + tolerance/100):
-            break
-
-        res_path, res_distance, res_turns = path, distance, turns
-        less_turns += 1
-
     path = [source]
     for road in res_path:
-        j1, j2 = get_roadnode(road)
+        j1, j2 = graph.get_roadnode(road)
         if path[-1] == j1:
             path.append(j2)
         else:
@@ -222,4 +400,4 @@ if __name__ == '__main__':
         print(res_turns, "turn")
     else:
         print(res_turns, "turns")
-    print(' -> '.join(map(lambda j: str(junctions[j]), path)))
+    print(' -> '.join(map(lambda j: str(tuple(graph.positions[j].tolist())), path)))
@@ -0,0 +1,272 @@
+"""
+Benchmarks für Aufgabe 2 (generate, scan und find_shortest in beiden Modi für alle Ziffern) und Aufgabe 3 (Routenplanung).
+Jeder Benchmark wird nach Aufwärmläufen mehrmals gemessen, ausgegeben werden Median, Streuung und der höchste Speicherbedarf.
+Die Ergebnisse werden als JSON geschrieben und mit einer gespeicherten Baseline verglichen. Ist ein Benchmark deutlich
+langsamer oder braucht er deutlich mehr Speicher als in der Baseline, endet das Programm mit Exit-Code 1.
+
+    python benchmark.py                       # messen und mit benchmark-baseline.json vergleichen
+    python benchmark.py --update-baseline     # messen und als neue Baseline speichern
+    python benchmark.py --filter 'a2/scan' -o results.json
+"""
+import os
+import re
+import gc
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import tracemalloc
+import importlib.util
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmark-baseline.json')
+
+# Version des Formats der JSON-Ausgabe
+FORMAT_VERSION = 1
+
+# Bis zu dieser Ebene werden die Tabellen für die Benchmarks von generate und scan aufgebaut
+GENERATE_LEVEL = 5
+# Zahlen, nach denen in den Benchmarks von scan gesucht wird
+SCAN_NUMBERS = range(1900, 2101, 10)
+# Zahlen der Beispiele aus der Aufgabenstellung, die end-to-end gesucht werden
+EXAMPLE_NUMBERS = (2019, 2030, 2080, 2980)
+# Toleranz (Prozent) der Routenplanung
+TOLERANCE = 15
+# Seitenlängen der erzeugten Gitter für Aufgabe 3. Die Beispiele und das kleine Gitter laufen in wenigen Millisekunden und liegen
+# damit unter MIN_REGRESSION_SECONDS, erst das große Gitter (10000 Kreuzungen) kann eine Verschlechterung der Routenplanung zeigen.
+GRID_SIZES = (12, 100)
+
+# Unterschiede unter so vielen Sekunden werden nie als Verschlechterung gewertet, da sie im Rauschen untergehen
+# (Zeitgeber, Caches und andere Prozesse verschieben Läufe von wenigen Millisekunden leicht um ein Vielfaches)
+MIN_REGRESSION_SECONDS = 0.02
+# Ebenso Unterschiede unter so vielen Bytes beim Speicherbedarf
+MIN_REGRESSION_BYTES = 2 ** 20
+
+
+def load_module(name, path):
+    """
+    Lädt die Datei path als Modul name. Beide Aufgaben heißen main.py und können daher nicht einfach importiert werden.
+    """
+    sys.path.insert(0, os.path.dirname(path))
+    try:
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.pop(0)
+    return module
+
+
+a2 = load_module('a2main', os.path.join(ROOT, 'a2-geburtstag', 'Implementierung', 'main.py'))
+a3 = load_module('a3main', os.path.join(ROOT, 'a3-abbiegen', 'Implementierung', 'main.py'))
+
+
+class Benchmark(object):
+    """
+    Ein Benchmark: setup() wird vor jedem Lauf ohne Zeitmessung aufgerufen, gemessen wird run(Ergebnis von setup()).
+    """
+
+    def __init__(self, name, run, setup=None):
+        self.name = name
+        self.run = run
+        self.setup = setup if setup is not None else lambda: None
+
+    def measure(self, repeat, warmup, memory):
+        """
+        Führt den Benchmark warmup mal ohne und repeat mal mit Zeitmessung aus.
+        Falls memory, wird in einem weiteren Lauf der höchste Speicherbedarf mit tracemalloc gemessen.
+        """
+        for _ in range(warmup):
+            self.run(self.setup())
+
+        times = []
+        for _ in range(repeat):
+            state = self.setup()
+            gc.collect()
+            begin = time.perf_counter()
+            self.run(state)
+            times.append(time.perf_counter() - begin)
+
+        result = {
+            'repeat': repeat,
+            'median': statistics.median(times),
+            'min': min(times),
+            'max': max(times),
+            'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+        }
+
+        if memory:
+            state = self.setup()
+            tracemalloc.start()
+            try:
+                self.run(state)
+                result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        return result
+
+
+def a2_benchmarks():
+    benchmarks = []
+    for extended in (False, True):
+        mode = 'extended' if extended else 'normal'
+        for digit in range(1, 10):
+            def generate(_, digit=digit, extended=extended):
+                a2.Tables(digit, extended).grow(GENERATE_LEVEL)
+
+            def scan_setup(digit=digit, extended=extended):
+                tables = a2.Tables(digit, extended)
+                tables.grow(GENERATE_LEVEL)
+                # Der erste Scan baut den ScanIndex auf, gemessen werden nur die Suchen
+                tables.scan(1)
+                return tables
+
+            def scan(tables):
+                for number in SCAN_NUMBERS:
+                    tables.scan(number)
+
+            def find_shortest(_, digit=digit, extended=extended):
+                for number in EXAMPLE_NUMBERS:
+                    a2.find_shortest(number, digit, extended)
+
+            benchmarks.append(Benchmark('a2/generate/{}/{}'.format(mode, digit), generate))
+            benchmarks.append(Benchmark('a2/scan/{}/{}'.format(mode, digit), scan, scan_setup))
+            benchmarks.append(Benchmark('a2/find_shortest/{}/{}'.format(mode, digit), find_shortest))
+    return benchmarks
+
+
+def grid(size):
+    """
+    Erzeugt ein Straßennetz aus size x size Kreuzungen, in dem jede Kreuzung mit ihren Nachbarn und dem diagonalen Nachbarn verbunden ist.
+    Gibt es wie parse_input() als (junctions, roads, Start, Ziel) zurück.
+    """
+    junctions = {}
+    roads = defaultdict(set)
+    for x in range(size):
+        for y in range(size):
+            junctions[x * size + y] = (x, y)
+    for x in range(size):
+        for y in range(size):
+            for dx, dy in ((1, 0), (0, 1), (1, 1)):
+                if x + dx < size and y + dy < size:
+                    a, b = x * size + y, (x + dx) * size + y + dy
+                    roads[a].add(b)
+                    roads[b].add(a)
+    return junctions, roads, 0, size * size - 1
+
+
+def a3_benchmarks():
+    benchmarks = []
+    directory = os.path.join(ROOT, 'material', 'a3-abbiegen')
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith('.txt'):
+            def route(_, path=os.path.join(directory, filename)):
+                junctions, roads, source, target = a3.parse_input(path)
+                a3.find_route(junctions, roads, source, target, TOLERANCE)
+
+            benchmarks.append(Benchmark('a3/route/{}'.format(filename[:-len('.txt')]), route))
+
+    def route_grid(network):
+        a3.find_route(*network, TOLERANCE)
+
+    for size in GRID_SIZES:
+        benchmarks.append(Benchmark('a3/route/grid{}'.format(size), route_grid, lambda size=size: grid(size)))
+    return benchmarks
+
+
+def compare(results, baseline, threshold):
+    """
+    Vergleicht die Ergebnisse mit der Baseline. Gibt die Liste der Verschlechterungen als Text zurück.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        # Verglichen wird der schnellste Lauf, da Störungen durch andere Prozesse Läufe nur langsamer machen
+        if result['min'] > base['min'] * (1 + threshold) and result['min'] - base['min'] > MIN_REGRESSION_SECONDS:
+            regressions.append('{}: fastest run {:.4f}s, baseline {:.4f}s (+{:.0%}), median {:.4f}s, baseline {:.4f}s'.format(
+                name, result['min'], base['min'], result['min'] / base['min'] - 1, result['median'], base['median']))
+        if 'peak_bytes' in result and 'peak_bytes' in base and result['peak_bytes'] > base['peak_bytes'] * (1 + threshold) \
+                and result['peak_bytes'] - base['peak_bytes'] > MIN_REGRESSION_BYTES:
+            regressions.append('{}: peak memory {} bytes, baseline {} bytes (+{:.0%})'.format(
+                name, result['peak_bytes'], base['peak_bytes'], result['peak_bytes'] / max(base['peak_bytes'], 1) - 1))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark both tasks and compare against a stored baseline")
+    parser.add_argument("--filter", "-k", help="only run benchmarks whose name matches this regular expression", default="")
+    parser.add_argument("--repeat", "-r", help="number of timed runs per benchmark", type=int, default=5)
+    parser.add_argument("--warmup", "-w", help="number of untimed runs before timing", type=int, default=1)
+    parser.add_argument("--no-memory", help="do not measure peak memory (saves one traced run per benchmark)", action='store_true')
+    parser.add_argument("--output", "-o", help="write the results as JSON to FILE ('-' for stdout)", metavar="FILE")
+    parser.add_argument("--baseline", help="baseline to compare against (default: %(default)s)", default=DEFAULT_BASELINE, metavar="FILE")
+    parser.add_argument("--update-baseline", help="store the results as the new baseline instead of comparing", action='store_true')
+    parser.add_argument("--threshold", help="relative slowdown or memory growth that counts as a regression (default: %(default)s)", type=float, default=0.5)
+    args = parser.parse_args()
+
+    if args.repeat < 1:
+        print("Error: --repeat must be at least 1", file=sys.stderr)
+        exit(1)
+
+    pattern = re.compile(args.filter)
+    benchmarks = [benchmark for benchmark in a2_benchmarks() + a3_benchmarks() if pattern.search(benchmark.name)]
+
+    results = {}
+    for benchmark in benchmarks:
+        result = benchmark.measure(args.repeat, args.warmup, not args.no_memory)
+        results[benchmark.name] = result
+        memory = ' peak {:8.1f} MiB'.format(result['peak_bytes'] / 2 ** 20) if 'peak_bytes' in result else ''
+        print('{:32} median {:9.4f}s  min {:9.4f}s  max {:9.4f}s  stdev {:8.4f}s{}'.format(
+            benchmark.name, result['median'], result['min'], result['max'], result['stdev'], memory), file=sys.stderr, flush=True)
+
+    data = {
+        'version': FORMAT_VERSION,
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'repeat': args.repeat,
+        'warmup': args.warmup,
+        'benchmarks': results,
+    }
+
+    if args.output == '-':
+        json.dump(data, sys.stdout, indent=1)
+        print()
+    elif args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(data, f, indent=1)
+
+    if args.update_baseline:
+        if os.path.exists(args.baseline):
+            # Benchmarks, die diesmal nicht gelaufen sind, behalten ihre alten Werte
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+            baseline['benchmarks'].update(results)
+            results = baseline['benchmarks']
+        data['benchmarks'] = dict(sorted(results.items()))
+        with open(args.baseline, 'w') as f:
+            json.dump(data, f, indent=1)
+        print("baseline written to", args.baseline, file=sys.stderr)
+        exit(0)
+
+    if not os.path.exists(args.baseline):
+        print("no baseline at", args.baseline, "- run with --update-baseline to create one", file=sys.stderr)
+        exit(0)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('version') != FORMAT_VERSION:
+        print("Error: baseline", args.baseline, "has an unknown format, run with --update-baseline", file=sys.stderr)
+        exit(1)
+
+    regressions = compare(results, baseline['benchmarks'], args.threshold)
+    if regressions:
+        print(file=sys.stderr)
+        for regression in regressions:
+            print("REGRESSION", regression, file=sys.stderr)
+        exit(1)
+    print("no regressions against", args.baseline, file=sys.stderr)